@@ -0,0 +1,126 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import numpy as np
+from ingest_manifest import KBVersionWatcher
+
+class SemanticAnswerCache:
+    """Answer cache keyed on the question embedding.
+
+    A lookup hits when the cosine similarity between the new question and
+    a cached one is at least ``threshold``. Entries expire after
+    ``ttl_seconds``, the oldest are evicted past ``max_entries``, and the
+    whole cache is dropped when the knowledge-base version written at
+    ingest time changes.
+    """
+
+    def __init__(self, threshold: Optional[float] = None,
+                 max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 kb_watcher: Optional[KBVersionWatcher] = None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+        self.max_entries = max_entries or int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+        self.kb_watcher = kb_watcher or KBVersionWatcher()
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: list = []
+        self._next_id = 0
+        self._kb_version = self.kb_watcher.current()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_kb_version(self):
+        version = self.kb_watcher.current()
+        if version != self._kb_version:
+            if self._entries:
+                print(f"♻️ Knowledge base changed ({self._kb_version} -> {version}), dropping answer cache")
+                self.invalidations += 1
+            self._entries.clear()
+            self._matrix = None
+            self._kb_version = version
+
+    def _expire(self, now: float):
+        expired = [key for key, entry in self._entries.items()
+                   if now - entry['created_at'] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _ensure_matrix(self):
+        if self._matrix is None:
+            self._keys = list(self._entries.keys())
+            self._matrix = (np.stack([self._entries[k]['embedding'] for k in self._keys])
+                            if self._keys else None)
+
+    def lookup(self, embedding) -> Optional[Dict[str, Any]]:
+        """Cached result for the most similar question above the threshold"""
+        query = self._normalize(embedding)
+        with self._lock:
+            self._check_kb_version()
+            self._expire(time.time())
+            self._ensure_matrix()
+
+            if self._matrix is None:
+                self.misses += 1
+                return None
+
+            similarities = self._matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = self._keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            entry = self._entries[key]
+            print(f"⚡ Answer cache hit (similarity {similarities[best]:.3f} to \"{entry['question'][:60]}\")")
+            return copy.copy(entry['result'])
+
+    def store(self, question: str, embedding, result: Dict[str, Any]):
+        with self._lock:
+            self._check_kb_version()
+            self._entries[self._next_id] = {
+                'question': question,
+                'embedding': self._normalize(embedding),
+                'result': copy.copy(result),
+                'created_at': time.time()
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'threshold': self.threshold,
+            'ttl_seconds': self.ttl_seconds,
+            'kb_version': self._kb_version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+        }
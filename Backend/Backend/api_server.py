@@ -1,10 +1,19 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import uvicorn
 from chatbot import PDFChatbot
+from async_chatbot import AsyncPDFChatbot
+from chat_executor import ChatExecutor, ExecutorSaturated, ExecutorTimeout
+from ingest_manifest import MANIFEST_PATH
+from session_store import DEFAULT_SESSION
+from neo4j_connection import get_connection_manager
 import os
+import json
+import asyncio
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -33,10 +42,24 @@ app.add_middleware(
 # Initialize chatbot instance
 chatbot = None
 
+# Bounded worker pool that runs the blocking chat pipeline off the event loop
+chat_executor = None
+
+# "threaded" runs the sync pipeline on the worker pool, "async" uses AsyncPDFChatbot
+CHAT_PIPELINE = os.getenv("CHAT_PIPELINE", "threaded").lower()
+
+# Prompt-context token budget per endpoint (falls back to CONTEXT_TOKEN_BUDGET)
+CONTEXT_BUDGETS = {
+    endpoint: int(os.getenv(f"{endpoint.upper()}_CONTEXT_TOKENS", "0")) or None
+    for endpoint in ("chat", "simple", "stream")
+}
+
 # Request/Response models
 class QuestionRequest(BaseModel):
     question: str
     use_history: Optional[bool] = True
+    # Conversation the question belongs to; requests without one share the default session
+    session_id: Optional[str] = None
 
 class Source(BaseModel):
     section_id: Optional[str] = None
@@ -73,14 +96,162 @@ class HealthResponse(BaseModel):
 # Startup event to initialize chatbot
 @app.on_event("startup")
 async def startup_event():
-    global chatbot
+    global chatbot, chat_executor
+    chat_executor = ChatExecutor()
+    print(f"✅ Chat executor ready ({chat_executor.max_workers} workers, queue depth {chat_executor.max_queue})")
     try:
-        chatbot = PDFChatbot()
-        print("✅ Chatbot initialized successfully")
+        chatbot = AsyncPDFChatbot() if CHAT_PIPELINE == "async" else PDFChatbot()
+        print(f"✅ Chatbot initialized successfully ({CHAT_PIPELINE} pipeline)")
     except Exception as e:
         print(f"⚠️ Warning: Chatbot initialization failed: {e}")
         print("The API will start but /chat endpoints won't work until chatbot is initialized")
         chatbot = None
+    
+    # Open graph connections now so the first requests don't pay the handshake
+    if chatbot is not None:
+        try:
+            if isinstance(chatbot, AsyncPDFChatbot):
+                await get_connection_manager().aprewarm()
+            else:
+                await asyncio.to_thread(get_connection_manager().prewarm)
+        except Exception as e:
+            print(f"⚠️ Neo4j pool pre-warm failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if chat_executor is not None:
+        chat_executor.shutdown()
+    if isinstance(chatbot, AsyncPDFChatbot):
+        await chatbot.close()
+    # Clients share these pools and never close them themselves
+    get_connection_manager().close()
+    await get_connection_manager().aclose()
+
+def pipeline_http_error(error: Exception) -> HTTPException:
+    """Map executor saturation to 429/503 and anything else to 500"""
+    if isinstance(error, ExecutorSaturated):
+        return HTTPException(
+            status_code=429,
+            detail="Too many questions in progress, please retry shortly",
+            headers={"Retry-After": "5"}
+        )
+    if isinstance(error, ExecutorTimeout):
+        return HTTPException(
+            status_code=503,
+            detail="Chatbot is busy, please retry shortly",
+            headers={"Retry-After": "10"}
+        )
+    return HTTPException(status_code=500, detail=f"Error processing question: {str(error)}")
+
+async def run_chat_pipeline(question: str, use_history: bool, session_id: str,
+                            context_budget: Optional[int] = None) -> Dict[str, Any]:
+    """Run the chat pipeline under admission control, mapping saturation to 429/503"""
+    ask = chatbot.aask_question if isinstance(chatbot, AsyncPDFChatbot) else chatbot.ask_question
+    try:
+        return await chat_executor.run(
+            ask,
+            question=question,
+            use_history=use_history,
+            session_id=session_id,
+            context_budget=context_budget
+        )
+    except Exception as e:
+        raise pipeline_http_error(e)
+
+def build_response_metadata(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Summary of the retrieval process returned alongside an answer"""
+    return {
+        "total_sources": len(result['sources']),
+        "unique_sections": len(set([s.get('full_section', '') for s in result['sources']])),
+        "completeness_score": result.get('validation', {}).get('completeness_score', None),
+        "content_sufficient": result.get('validation', {}).get('completeness_score', 0) >= 7,
+        "query_expanded": len(result.get('expanded_queries', [])) > 1,
+        "cache_hit": result.get('cache_hit', False),
+        "timings": {} if result.get('cache_hit') else result.get('timings', {}),
+        "context_tokens": result.get('context', {}).get('tokens'),
+        "context_budget": result.get('context', {}).get('budget'),
+        "top_sources": [
+            {
+                "section": s.get('full_section', 'Unknown')[:80],
+                "page": s.get('page', 'N/A'),
+                "file": s.get('source_file', 'N/A')
+            }
+            for s in result['sources'][:3]  # Top 3 sources
+        ]
+    }
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def open_chat_stream(question: str, use_history: bool, session_id: str,
+                           context_budget: Optional[int] = None):
+    """Start the streaming pipeline under admission control.
+
+    Events are pumped into an asyncio.Queue by a job on the chat executor
+    (a worker thread for the sync chatbot, the loop itself for the async
+    one). Waits for the first event so saturation still maps to 429/503
+    before the response starts; returns an async iterator of SSE strings.
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    finished = object()
+
+    if isinstance(chatbot, AsyncPDFChatbot):
+        async def pump():
+            try:
+                async for item in chatbot.astream_question(question, use_history, session_id, context_budget):
+                    events.put_nowait(item)
+            finally:
+                events.put_nowait(finished)
+    else:
+        def pump():
+            try:
+                for item in chatbot.stream_question(question, use_history, session_id, context_budget):
+                    loop.call_soon_threadsafe(events.put_nowait, item)
+                    if stop.is_set():
+                        # Client went away: closing the generator stops reading from Groq
+                        break
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, finished)
+
+    job = asyncio.create_task(chat_executor.run(pump))
+
+    async def next_item():
+        getter = asyncio.ensure_future(events.get())
+        done, _ = await asyncio.wait({getter, job}, return_when=asyncio.FIRST_COMPLETED)
+        if getter in done:
+            return getter.result()
+        getter.cancel()
+        job.result()  # re-raises admission errors
+        return await events.get()
+
+    try:
+        first = await next_item()
+    except Exception as e:
+        raise pipeline_http_error(e)
+
+    async def sse():
+        item = first
+        try:
+            while item is not finished:
+                event, payload = item
+                if event == 'done':
+                    payload = {
+                        "answer": payload['answer'],
+                        "validation": payload.get('validation'),
+                        "metadata": build_response_metadata(payload)
+                    }
+                yield sse_event(event, payload)
+                item = await next_item()
+        except Exception as e:
+            yield sse_event('error', {'detail': pipeline_http_error(e).detail})
+        finally:
+            stop.set()
+            if not job.done() and isinstance(chatbot, AsyncPDFChatbot):
+                job.cancel()
+
+    return sse()
 
 # Health check endpoint
 @app.get("/health", response_model=HealthResponse)
@@ -106,28 +277,13 @@ async def chat(request: QuestionRequest):
     if not request.question or not request.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
     
+    result = await run_chat_pipeline(request.question.strip(), request.use_history,
+                                     request.session_id or DEFAULT_SESSION,
+                                     CONTEXT_BUDGETS["chat"])
+    
     try:
-        result = chatbot.ask_question(
-            question=request.question.strip(),
-            use_history=request.use_history
-        )
-        
         # Build enhanced metadata
-        metadata = {
-            "total_sources": len(result['sources']),
-            "unique_sections": len(set([s.get('full_section', '') for s in result['sources']])),
-            "completeness_score": result.get('validation', {}).get('completeness_score', None),
-            "content_sufficient": result.get('validation', {}).get('completeness_score', 0) >= 7,
-            "query_expanded": len(result.get('expanded_queries', [])) > 1,
-            "top_sources": [
-                {
-                    "section": s.get('full_section', 'Unknown')[:80],
-                    "page": s.get('page', 'N/A'),
-                    "file": s.get('source_file', 'N/A')
-                }
-                for s in result['sources'][:3]  # Top 3 sources
-            ]
-        }
+        metadata = build_response_metadata(result)
         
         return {
             "answer": result['answer'],
@@ -140,6 +296,35 @@ async def chat(request: QuestionRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
+# Streaming chat endpoint - Server-Sent Events
+@app.post("/chat/stream")
+async def chat_stream(request: QuestionRequest):
+    """
+    Send a question and receive the answer as Server-Sent Events
+    
+    Events, in order:
+    - **metadata**: sources, expanded queries and validation, sent before generation starts
+    - **token**: a piece of the answer text (repeated)
+    - **footer**: the course topics footer
+    - **done**: the full answer, validation and the same metadata as /chat
+    
+    An **error** event is sent instead of tokens if the pipeline fails.
+    """
+    if chatbot is None:
+        raise HTTPException(status_code=503, detail="Chatbot not initialized")
+    
+    if not request.question or not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    
+    events = await open_chat_stream(request.question.strip(), request.use_history,
+                                    request.session_id or DEFAULT_SESSION,
+                                    CONTEXT_BUDGETS["stream"])
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Simple chat endpoint - returns only answer text (like terminal)
 @app.post("/chat/simple")
 async def chat_simple(request: QuestionRequest):
@@ -158,46 +343,64 @@ async def chat_simple(request: QuestionRequest):
     if not request.question or not request.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
     
-    try:
-        result = chatbot.ask_question(
-            question=request.question.strip(),
-            use_history=request.use_history
-        )
-        
-        # Return ONLY the answer text
-        return {"answer": result['answer']}
+    result = await run_chat_pipeline(request.question.strip(), request.use_history,
+                                     request.session_id or DEFAULT_SESSION,
+                                     CONTEXT_BUDGETS["simple"])
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
+    # Return ONLY the answer text
+    return {"answer": result['answer']}
 
 # Clear conversation history endpoint
 @app.post("/clear-history")
-async def clear_history():
-    """Clear the conversation history"""
+async def clear_history(session_id: str = DEFAULT_SESSION):
+    """Clear the conversation history of one session"""
     if chatbot is None:
         raise HTTPException(status_code=503, detail="Chatbot not initialized")
     
     try:
-        chatbot.clear_history()
+        chatbot.clear_history(session_id)
         return {"status": "success", "message": "Conversation history cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing history: {str(e)}")
 
 # Get conversation history endpoint
 @app.get("/history")
-async def get_history():
-    """Get the current conversation history"""
+async def get_history(session_id: str = DEFAULT_SESSION):
+    """Get the conversation history of one session"""
     if chatbot is None:
         raise HTTPException(status_code=503, detail="Chatbot not initialized")
     
     try:
+        history = chatbot.history.recent(session_id)
         return {
-            "history": chatbot.conversation_history,
-            "count": len(chatbot.conversation_history)
+            "session_id": session_id,
+            "history": history,
+            "count": len(history)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving history: {str(e)}")
     
+# Worker pool load and counters
+@app.get("/stats")
+async def get_stats():
+    """Get concurrency and cache statistics for the chat pipeline.
+    
+    graph_cache only sees traffic when graph_source is "neo4j", i.e. the
+    in-memory section graph is disabled or empty.
+    """
+    return {
+        "executor": chat_executor.stats() if chat_executor else None,
+        "validation_mode": chatbot.validation_mode if chatbot else None,
+        "embedding_cache": chatbot.retriever.pinecone_client.embedding_cache.stats() if chatbot else None,
+        "answer_cache": chatbot.answer_cache.stats() if chatbot and chatbot.answer_cache else None,
+        "pre_validator": chatbot.pre_validator.stats() if chatbot and chatbot.pre_validator else None,
+        "history": chatbot.history.stats() if chatbot else None,
+        "reranker": chatbot.retriever.reranker.stats() if chatbot and chatbot.retriever.reranker else None,
+        "graph_source": chatbot.retriever.graph_source() if chatbot else None,
+        "graph_cache": chatbot.retriever.graph_cache.stats() if chatbot and chatbot.retriever.graph_cache else None,
+        "graph_pool": get_connection_manager().stats()
+    }
+
 @app.get("/")
 async def root():
     return {
@@ -210,7 +413,7 @@ async def root():
 # Run the server
 if __name__ == "__main__":
     # Check if data is processed
-    if not os.path.exists("data/processed/txt_processed.flag"):
+    if not (os.path.exists(MANIFEST_PATH) or os.path.exists("data/processed/txt_processed.flag")):
         print("\n❌ TXT file not processed yet!")
         print("Please run: python process_txt_pipeline.py")
         print("First, make sure your TXT files are in: data/txts/")
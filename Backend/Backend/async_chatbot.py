@@ -0,0 +1,277 @@
+import asyncio
+import os
+import time
+from typing import Dict, Any, AsyncIterator, Optional, Tuple
+from groq import AsyncGroq
+from chatbot import PDFChatbot, _ms_since
+from session_store import DEFAULT_SESSION
+from async_hybrid_retriever import AsyncHybridRetriever
+
+class AsyncPDFChatbot(PDFChatbot):
+    """PDFChatbot with an asyncio-native question path.
+
+    Prompts, validation parsing and result shaping are shared with the
+    sync chatbot; only the network calls differ (AsyncHybridRetriever and
+    AsyncGroq).
+    """
+
+    retriever_class = AsyncHybridRetriever
+
+    def __init__(self):
+        super().__init__()
+        self.llm_timeout = float(os.getenv("ASYNC_LLM_TIMEOUT", "60"))
+        self.async_groq_client = AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            max_retries=2
+        )
+
+    async def close(self):
+        await self.retriever.close()
+        await self.async_groq_client.close()
+
+    async def aask_question(self, question: str, use_history: bool = True,
+                            session_id: str = DEFAULT_SESSION,
+                            context_budget: Optional[int] = None) -> Dict[str, Any]:
+        """Async version of ask_question()"""
+        question_embedding, cached = await asyncio.to_thread(
+            self._check_answer_cache, question, use_history, session_id
+        )
+        if cached is not None:
+            return cached
+
+        result = await self._aanswer_question(question, use_history, session_id, context_budget)
+        self._store_answer(question, question_embedding, result)
+        return result
+
+    async def _aanswer_question(self, question: str, use_history: bool = True,
+                                session_id: str = DEFAULT_SESSION,
+                                context_budget: Optional[int] = None) -> Dict[str, Any]:
+        """Async version of _answer_question()"""
+        print("🔍 Analyzing question and retrieving context...")
+        timings = {'validation_mode': self.validation_mode}
+        started = time.perf_counter()
+
+        try:
+            retrieved_context = await self.retriever.aretrieve(question, token_budget=context_budget)
+            timings['retrieval_ms'] = _ms_since(started)
+
+            if not retrieved_context.vector_results:
+                return self._no_results_response()
+
+            local_result = self.pre_validator.assess(question, retrieved_context) if self.pre_validator else None
+            if local_result is not None:
+                validation_result, answer = await self._aanswer_from_local(question, retrieved_context, local_result, timings, session_id)
+            elif self.validation_mode == "combined":
+                validation_result, answer = await self._avalidate_and_answer_combined(question, retrieved_context, timings, session_id)
+            elif self.validation_mode == "speculative":
+                validation_result, answer = await self._avalidate_and_answer_speculative(question, retrieved_context, timings, session_id)
+            else:
+                validation_result, answer = await self._avalidate_and_answer_sequential(question, retrieved_context, timings, session_id)
+
+            if local_result is None:
+                self._observe_llm_verdict(question, retrieved_context, validation_result)
+
+            if answer is None:
+                print(f"⚠️ Content insufficient (score: {validation_result['completeness_score']}/10)")
+                result = self._limitation_result(question, validation_result, retrieved_context)
+            else:
+                print(f"✅ Content sufficient (score: {validation_result['completeness_score']}/10)")
+                result = self._finalize_answer(question, answer, retrieved_context, validation_result, use_history, session_id)
+
+            timings['total_ms'] = _ms_since(started)
+            print(f"⏱️ Timings: {timings}")
+            result['timings'] = timings
+            result['context'] = retrieved_context.context_stats
+            return result
+
+        except Exception as e:
+            return self._error_response(e)
+
+    async def _aanswer_from_local(self, question: str, retrieved_context: Any,
+                                  validation_result: Dict[str, Any], timings: Dict[str, Any], session_id: str):
+        """Async version of _answer_from_local()"""
+        print(f"⚡ Pre-validator: {validation_result['reasoning']}")
+        timings['validated_by'] = 'local'
+        if validation_result['completeness_score'] < 7:
+            return validation_result, None
+
+        stage = time.perf_counter()
+        answer = await self._asynthesize(question, retrieved_context, session_id)
+        timings['synthesis_ms'] = _ms_since(stage)
+        return validation_result, answer
+
+    async def _avalidate_and_answer_sequential(self, question: str, retrieved_context: Any,
+                                               timings: Dict[str, Any], session_id: str):
+        """Async version of _validate_and_answer_sequential()"""
+        stage = time.perf_counter()
+        print("🔬 Validating content sufficiency...")
+        validation_result = await self._avalidate_content_sufficiency(question, retrieved_context)
+        timings['validation_ms'] = _ms_since(stage)
+
+        if validation_result['completeness_score'] < 7:
+            return validation_result, None
+
+        stage = time.perf_counter()
+        answer = await self._asynthesize(question, retrieved_context, session_id)
+        timings['synthesis_ms'] = _ms_since(stage)
+        return validation_result, answer
+
+    async def _avalidate_and_answer_speculative(self, question: str, retrieved_context: Any,
+                                                timings: Dict[str, Any], session_id: str):
+        """Async version of _validate_and_answer_speculative(); the losing synthesis is cancelled"""
+        stage = time.perf_counter()
+        print("🔬 Validating content sufficiency (speculative synthesis)...")
+        synthesis = asyncio.create_task(self._asynthesize(question, retrieved_context, session_id))
+        try:
+            validation_result = await self._avalidate_content_sufficiency(question, retrieved_context)
+        except BaseException:
+            synthesis.cancel()
+            raise
+        timings['validation_ms'] = _ms_since(stage)
+
+        if validation_result['completeness_score'] < 7:
+            synthesis.cancel()
+            timings['speculation_wasted'] = True
+            return validation_result, None
+
+        answer = await synthesis
+        timings['synthesis_ms'] = _ms_since(stage)
+        return validation_result, answer
+
+    async def _avalidate_and_answer_combined(self, question: str, retrieved_context: Any,
+                                             timings: Dict[str, Any], session_id: str):
+        """Async version of _validate_and_answer_combined()"""
+        stage = time.perf_counter()
+        print("🤖 Validating and answering in one call...")
+        try:
+            response = await asyncio.wait_for(
+                self.async_groq_client.chat.completions.create(
+                    **self._combined_request(question, retrieved_context, session_id)
+                ),
+                timeout=self.llm_timeout
+            )
+            validation_result, answer = self._parse_combined(response.choices[0].message.content)
+        except Exception as e:
+            print(f"⚠️ Combined response unusable ({e!r}), falling back to sequential")
+            timings['combined_fallback'] = True
+            return await self._avalidate_and_answer_sequential(question, retrieved_context, timings, session_id)
+
+        timings['combined_ms'] = _ms_since(stage)
+        if validation_result['completeness_score'] < 7:
+            return validation_result, None
+        if not answer:
+            # Rated answerable but the answer part is missing; ask for it separately
+            stage = time.perf_counter()
+            answer = await self._asynthesize(question, retrieved_context, session_id)
+            timings['synthesis_ms'] = _ms_since(stage)
+        return validation_result, answer
+
+    async def _asynthesize(self, question: str, retrieved_context: Any, session_id: str = DEFAULT_SESSION) -> str:
+        """Async version of _synthesize()"""
+        prompt = self._build_synthesis_prompt(question, retrieved_context, session_id)
+
+        print("🤖 Generating synthesized answer...")
+        response = await asyncio.wait_for(
+            self.async_groq_client.chat.completions.create(**self._synthesis_request(prompt)),
+            timeout=self.llm_timeout
+        )
+        return response.choices[0].message.content
+
+    async def astream_question(self, question: str, use_history: bool = True,
+                               session_id: str = DEFAULT_SESSION,
+                               context_budget: Optional[int] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Async version of stream_question()"""
+        question_embedding, cached = await asyncio.to_thread(
+            self._check_answer_cache, question, use_history, session_id
+        )
+        if cached is not None:
+            yield 'metadata', self._stream_metadata(cached)
+            yield 'token', {'text': cached['answer']}
+            yield 'done', cached
+            return
+
+        print("🔍 Analyzing question and retrieving context...")
+        timings = {'validation_mode': 'streaming'}
+        started = time.perf_counter()
+
+        try:
+            retrieved_context = await self.retriever.aretrieve(question, token_budget=context_budget)
+            timings['retrieval_ms'] = _ms_since(started)
+
+            if not retrieved_context.vector_results:
+                result = self._no_results_response()
+                yield 'metadata', self._stream_metadata(result)
+                yield 'token', {'text': result['answer']}
+                yield 'done', result
+                return
+
+            stage = time.perf_counter()
+            validation_result = self.pre_validator.assess(question, retrieved_context) if self.pre_validator else None
+            if validation_result is None:
+                print("🔬 Validating content sufficiency...")
+                validation_result = await self._avalidate_content_sufficiency(question, retrieved_context)
+                self._observe_llm_verdict(question, retrieved_context, validation_result)
+            else:
+                timings['validated_by'] = 'local'
+            timings['validation_ms'] = _ms_since(stage)
+
+            if validation_result['completeness_score'] < 7:
+                result = self._limitation_result(question, validation_result, retrieved_context)
+                yield 'metadata', self._stream_metadata(result)
+                yield 'token', {'text': result['answer']}
+            else:
+                yield 'metadata', self._stream_metadata({
+                    'sources': [r.metadata for r in retrieved_context.vector_results],
+                    'expanded_queries': retrieved_context.expanded_queries,
+                    'validation': validation_result
+                })
+
+                print("🤖 Streaming synthesized answer...")
+                stage = time.perf_counter()
+                stream = await asyncio.wait_for(
+                    self.async_groq_client.chat.completions.create(
+                        **self._synthesis_request(self._build_synthesis_prompt(question, retrieved_context, session_id)),
+                        stream=True
+                    ),
+                    timeout=self.llm_timeout
+                )
+                parts = []
+                async for chunk in stream:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        if not parts:
+                            timings['first_token_ms'] = _ms_since(started)
+                        parts.append(text)
+                        yield 'token', {'text': text}
+                timings['synthesis_ms'] = _ms_since(stage)
+
+                yield 'footer', {'text': self._get_course_topics_footer()}
+                result = self._finalize_answer(question, ''.join(parts), retrieved_context,
+                                               validation_result, use_history, session_id)
+
+            timings['total_ms'] = _ms_since(started)
+            print(f"⏱️ Timings: {timings}")
+            result['timings'] = timings
+            result['context'] = retrieved_context.context_stats
+            self._store_answer(question, question_embedding, result)
+            yield 'done', result
+
+        except Exception as e:
+            result = self._error_response(e)
+            yield 'error', {'detail': str(e)}
+            yield 'done', result
+
+    async def _avalidate_content_sufficiency(self, question: str, retrieved_context: Any) -> Dict[str, Any]:
+        """Async version of _validate_content_sufficiency()"""
+        try:
+            response = await asyncio.wait_for(
+                self.async_groq_client.chat.completions.create(
+                    **self._validation_request(question, retrieved_context)
+                ),
+                timeout=self.llm_timeout
+            )
+            return self._parse_validation(response.choices[0].message.content)
+
+        except Exception as e:
+            print(f"⚠️ Validation error: {e!r}")
+            return self._fallback_validation()
@@ -0,0 +1,124 @@
+import asyncio
+import os
+from typing import List, Any, Optional
+from hybrid_retriever import EnhancedHybridRetriever, RetrievedContext
+from neo4j_client import AsyncNeo4jClient
+from pinecone_client import AsyncPineconeClient
+from local_vector_index import LocalVectorIndex, AsyncLocalVectorIndex
+
+class AsyncHybridRetriever(EnhancedHybridRetriever):
+    """asyncio-native retriever.
+
+    All expanded-query searches go out at once with asyncio.gather, so
+    retrieval costs roughly the slowest single query instead of the sum.
+    Each network stage has its own timeout.
+    """
+
+    def __init__(self, pinecone_index: str = "pdf-knowledge-base"):
+        super().__init__(pinecone_index)
+        self.vector_timeout = float(os.getenv("ASYNC_VECTOR_TIMEOUT", "5"))
+        self.graph_timeout = float(os.getenv("ASYNC_GRAPH_TIMEOUT", "5"))
+
+        async_client = AsyncLocalVectorIndex if isinstance(self.pinecone_client, LocalVectorIndex) else AsyncPineconeClient
+        self.async_pinecone = async_client(self.pinecone_client, timeout=self.vector_timeout)
+        self.async_neo4j = AsyncNeo4jClient()
+
+    async def close(self):
+        await self.async_pinecone.close()
+        await self.async_neo4j.close()
+
+    async def aretrieve(self, query: str, top_k: int = 8,
+                        token_budget: Optional[int] = None) -> RetrievedContext:
+        """Async version of retrieve()"""
+
+        # 1. Expand query (but keep it focused)
+        expanded_queries = self.query_expander.expand_query(query)
+        print(f"🔍 Original query: {query}")
+        print(f"📝 Expanded to {len(expanded_queries)} variations")
+
+        # 2. Search original + top 3 expansions concurrently
+        search_queries = [query] + expanded_queries[1:4]
+        top_ks = [5] + [2] * (len(search_queries) - 1)
+        if self.reranker is not None:
+            # Give the cross-encoder a wider pool from the original query
+            top_ks[0] = max(top_ks[0], self.reranker.candidates - sum(top_ks[1:]))
+
+        embeddings = await self.async_pinecone.create_embeddings(search_queries)
+        results = await asyncio.gather(
+            *[self._query_with_timeout(embedding, k) for embedding, k in zip(embeddings, top_ks)],
+            return_exceptions=True
+        )
+
+        # The original query must succeed; failed expansions are just dropped
+        if isinstance(results[0], BaseException):
+            raise results[0]
+
+        expanded_results = []
+        for expanded_query, result in zip(search_queries[1:], results[1:]):
+            if isinstance(result, BaseException):
+                print(f"⚠️ Expanded search failed for '{expanded_query}': {result!r}")
+                continue
+            expanded_results.append(result)
+
+        # Reloading the BM25 index or the section graph reads files or queries
+        # Neo4j synchronously, so after a knowledge base change do it off the loop
+        if self._indexes_stale():
+            await asyncio.to_thread(self._reload_indexes)
+
+        # 3. Remove duplicates and re-rank
+        candidates = self._candidate_count(top_k)
+        vector_results = self._merge_vector_results(results[0], expanded_results, candidates)
+        vector_results = self._fuse_lexical(query, vector_results, candidates)
+        if self.reranker is not None:
+            vector_results = await self.reranker.arerank(query, vector_results, top_k)
+
+        # 4. Extract Neo4j IDs from vector results
+        neo4j_ids = self._extract_neo4j_ids(vector_results)
+
+        # 5. Get related context from Neo4j
+        graph_context = {}
+        if neo4j_ids:
+            graph_context = self._snapshot_context(neo4j_ids)
+            if graph_context is None:
+                try:
+                    if self.graph_cache is not None:
+                        lookup = self.graph_cache.aget(neo4j_ids, self.async_neo4j.get_related_context)
+                    else:
+                        lookup = self.async_neo4j.get_related_context(neo4j_ids)
+                    graph_context = await asyncio.wait_for(lookup, timeout=self.graph_timeout)
+                    print(f"📚 Retrieved {len(graph_context.get('context', []))} graph nodes")
+                except asyncio.TimeoutError:
+                    print(f"⚠️ Neo4j query timed out after {self.graph_timeout}s")
+                    graph_context = {'context': []}
+                except Exception as e:
+                    print(f"⚠️ Neo4j query error: {e}")
+                    graph_context = {'context': []}
+
+        # 6. Combine context intelligently
+        combined_context, context_stats = self._build_intelligent_context(
+            query, vector_results, graph_context, token_budget
+        )
+
+        return RetrievedContext(
+            vector_results=vector_results,
+            graph_context=graph_context,
+            combined_context=combined_context,
+            context_stats=context_stats,
+            expanded_queries=expanded_queries
+        )
+
+    def _indexes_stale(self) -> bool:
+        return ((self.lexical_enabled and self._lexical_stale()) or
+                (self.section_graph_enabled and self._graph_snapshot_stale()))
+
+    def _reload_indexes(self):
+        if self.lexical_enabled:
+            self._lexical()
+        if self.section_graph_enabled:
+            self._graph_snapshot()
+
+    async def _query_with_timeout(self, embedding: List[float], top_k: int) -> List[Any]:
+        return await asyncio.wait_for(
+            self.async_pinecone.query(embedding, top_k),
+            timeout=self.vector_timeout
+        )
@@ -0,0 +1,183 @@
+import json
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional
+import numpy as np
+from pinecone_client import VectorMatch
+
+BM25_INDEX_PATH = "data/processed/bm25_index"
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how', 'in', 'is',
+    'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were', 'what',
+    'which', 'with', 'does', 'do', 'explain', 'describe', 'define'
+}
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r'[a-z0-9]+', text.lower()) if t not in STOPWORDS]
+
+class BM25Index:
+    """Okapi BM25 over the chunks produced by TXTStructureParser.create_chunks.
+
+    Serialized as two files: ``<path>.npz`` holds the document-major term
+    frequencies in CSR form (offsets, term ids, counts) and ``<path>.json``
+    the vocabulary, chunk ids, sources and metadata. The term-major
+    postings used for scoring are derived from that at load time.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.sources: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.doc_offsets = np.zeros(1, dtype=np.int64)
+        self.doc_terms = np.zeros(0, dtype=np.uint32)
+        self.doc_tfs = np.zeros(0, dtype=np.uint16)
+        self._finalize()
+
+    # --- building ----------------------------------------------------------
+
+    def replace_source(self, source_file: str, chunks: List[Dict[str, Any]]):
+        """Replace every document of source_file with freshly parsed chunks"""
+        keep = [i for i, source in enumerate(self.sources) if source != source_file]
+
+        rows = [self._doc_row(i) for i in keep]
+        ids = [self.ids[i] for i in keep]
+        sources = [self.sources[i] for i in keep]
+        metadata = [self.metadata[i] for i in keep]
+
+        for chunk in chunks:
+            counts: Dict[int, int] = {}
+            for token in tokenize(f"{chunk['metadata'].get('title', '')} {chunk['text']}"):
+                term = self.vocab.setdefault(token, len(self.vocab))
+                counts[term] = counts.get(term, 0) + 1
+            rows.append((np.fromiter(counts.keys(), dtype=np.uint32, count=len(counts)),
+                         np.fromiter((min(c, 65535) for c in counts.values()), dtype=np.uint16, count=len(counts))))
+            ids.append(chunk['id'])
+            sources.append(source_file)
+            metadata.append({**chunk['metadata'], 'type': 'document_chunk'})
+
+        self.ids, self.sources, self.metadata = ids, sources, metadata
+        lengths = [len(terms) for terms, _ in rows]
+        self.doc_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self.doc_terms = np.concatenate([t for t, _ in rows]) if rows else np.zeros(0, dtype=np.uint32)
+        self.doc_tfs = np.concatenate([f for _, f in rows]) if rows else np.zeros(0, dtype=np.uint16)
+        self._finalize()
+
+    def _doc_row(self, doc: int):
+        start, end = self.doc_offsets[doc], self.doc_offsets[doc + 1]
+        return self.doc_terms[start:end], self.doc_tfs[start:end]
+
+    def _finalize(self):
+        """Derive document lengths and term-major postings from the CSR rows"""
+        n_docs = len(self.ids)
+        doc_of_entry = np.repeat(np.arange(n_docs, dtype=np.uint32), np.diff(self.doc_offsets))
+        self.doc_lengths = np.bincount(doc_of_entry, weights=self.doc_tfs, minlength=n_docs).astype(np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if n_docs else 0.0
+
+        order = np.argsort(self.doc_terms, kind='stable')
+        self.post_docs = doc_of_entry[order]
+        self.post_tfs = self.doc_tfs[order].astype(np.float32)
+        counts = np.bincount(self.doc_terms, minlength=len(self.vocab))
+        self.post_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    # --- persistence ---------------------------------------------------------
+
+    @staticmethod
+    def exists(path: str = BM25_INDEX_PATH) -> bool:
+        return os.path.exists(path + ".npz") and os.path.exists(path + ".json")
+
+    @classmethod
+    def load(cls, path: str = BM25_INDEX_PATH) -> "BM25Index":
+        index = cls()
+        if not cls.exists(path):
+            return index
+        with open(path + ".json", 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        arrays = np.load(path + ".npz")
+        index.k1, index.b = table['k1'], table['b']
+        index.vocab = {term: i for i, term in enumerate(table['vocab'])}
+        index.ids, index.sources, index.metadata = table['ids'], table['sources'], table['metadata']
+        index.doc_offsets = arrays['doc_offsets']
+        index.doc_terms = arrays['doc_terms']
+        index.doc_tfs = arrays['doc_tfs']
+        index._finalize()
+        return index
+
+    def save(self, path: str = BM25_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # np.savez adds .npz itself, so the temp name has to end with it too
+        np.savez_compressed(path + ".tmp.npz", doc_offsets=self.doc_offsets,
+                            doc_terms=self.doc_terms, doc_tfs=self.doc_tfs)
+        with open(path + ".json.tmp", 'w', encoding='utf-8') as f:
+            json.dump({
+                'k1': self.k1,
+                'b': self.b,
+                'vocab': sorted(self.vocab, key=self.vocab.get),
+                'ids': self.ids,
+                'sources': self.sources,
+                'metadata': self.metadata
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(path + ".tmp.npz", path + ".npz")
+        os.replace(path + ".json.tmp", path + ".json")
+        print(f"💾 BM25 index saved: {len(self.ids)} chunks, {len(self.vocab)} terms")
+
+    # --- search ------------------------------------------------------------------
+
+    def search(self, query: str, top_k: int = 5) -> List[VectorMatch]:
+        """Chunks ranked by BM25 score for the query terms"""
+        n_docs = len(self.ids)
+        if not n_docs:
+            return []
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self.vocab.get(token)
+            if term is None:
+                continue
+            start, end = self.post_offsets[term], self.post_offsets[term + 1]
+            docs, tfs = self.post_docs[start:end], self.post_tfs[start:end]
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_length)
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        top_k = min(top_k, int(np.count_nonzero(scores)))
+        if not top_k:
+            return []
+        rows = np.argpartition(-scores, top_k - 1)[:top_k]
+        rows = rows[np.argsort(-scores[rows])]
+        return [
+            VectorMatch(id=self.ids[row], score=float(scores[row]), metadata=dict(self.metadata[row]))
+            for row in rows
+        ]
+
+def reciprocal_rank_fusion(dense: List[Any], lexical: List[Any], top_k: int,
+                           k: Optional[int] = None) -> List[Any]:
+    """Merge two ranked lists by sum of 1 / (k + rank), returned in fused order.
+
+    Results come back as VectorMatch with the RRF sum in ``fused_score``.
+    ``score`` stays the dense cosine similarity, and is None for a hit
+    only BM25 found, so cosine thresholds never see a made-up similarity.
+    Metadata dicts are passed through untouched.
+    """
+    k = k or int(os.getenv("RRF_K", "60"))
+    fused: Dict[str, float] = {}
+    by_id: Dict[str, Any] = {}
+    for ranking in (dense, lexical):
+        for rank, result in enumerate(ranking, 1):
+            fused[result.id] = fused.get(result.id, 0.0) + 1.0 / (k + rank)
+            by_id.setdefault(result.id, result)
+
+    dense_ids = {r.id for r in dense}
+    return [
+        VectorMatch(
+            id=chunk_id,
+            score=by_id[chunk_id].score if chunk_id in dense_ids else None,
+            metadata=by_id[chunk_id].metadata,
+            fused_score=fused[chunk_id]
+        )
+        for chunk_id in sorted(fused, key=fused.get, reverse=True)[:top_k]
+    ]
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the admission queue is already full"""
+
+
+class ExecutorTimeout(Exception):
+    """Raised when a job waited too long for a free worker"""
+
+
+class ChatExecutor:
+    """Bounded worker pool with admission control for the blocking chat pipeline.
+
+    Jobs run on a fixed-size thread pool so the event loop stays free for
+    other requests (including /health). At most ``max_workers`` jobs run at
+    once and at most ``max_queue`` more may wait for a slot; anything beyond
+    that is rejected immediately instead of piling up.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 max_queue: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        self.max_workers = max_workers or int(os.getenv("CHAT_MAX_WORKERS", "8"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("CHAT_MAX_QUEUE", "32"))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(os.getenv("CHAT_QUEUE_TIMEOUT", "30"))
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="chat-worker"
+        )
+        self._slots = asyncio.Semaphore(self.max_workers)
+
+        # Counters are only touched from the event loop thread
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.last_duration = 0.0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable (or coroutine function) respecting the admission limits"""
+        if self.running + self.waiting >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturated(
+                f"{self.running} running and {self.waiting} queued requests"
+            )
+
+        self.waiting += 1
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquire), timeout=self.queue_timeout)
+        except BaseException as e:
+            # The acquire may complete anyway (or already have); give the
+            # permit back once it does so the slot isn't leaked
+            acquire.cancel()
+            acquire.add_done_callback(self._release_if_acquired)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise ExecutorTimeout(f"No worker free after {self.queue_timeout:.0f}s")
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        if asyncio.iscoroutinefunction(func):
+            # Async pipelines run on the loop itself but still count
+            # against the same admission limits
+            job = asyncio.ensure_future(func(*args, **kwargs))
+            job.add_done_callback(lambda f: self._finish(f, started))
+        else:
+            # The slot belongs to the worker, not the request: a client that
+            # disconnects stops waiting but the job keeps its slot until the
+            # thread is actually done
+            future = self._executor.submit(func, *args, **kwargs)
+            future.add_done_callback(
+                lambda f: loop.call_soon_threadsafe(self._finish, f, started)
+            )
+            job = asyncio.wrap_future(future)
+        return await job
+
+    def _release_if_acquired(self, acquire: "asyncio.Future"):
+        if not acquire.cancelled() and acquire.exception() is None:
+            self._slots.release()
+
+    def _finish(self, job, started: float):
+        """Done-callback of a job: free its slot and record the outcome"""
+        self.running -= 1
+        self._slots.release()
+        self.last_duration = time.perf_counter() - started
+        if job.cancelled():
+            return
+        if job.exception() is None:
+            self.completed += 1
+        elif isinstance(job.exception(), Exception):
+            self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load and lifetime counters"""
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'running': self.running,
+            'queued': self.waiting,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'last_duration_ms': round(self.last_duration * 1000, 1)
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
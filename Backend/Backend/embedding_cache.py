@@ -0,0 +1,236 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class DiskEmbeddingStore:
+    """Append-only, memory-mapped float32 matrix of embeddings plus a key -> row index.
+
+    API workers and the ingest process may share one store. New vectors
+    are buffered until flush(), which holds an exclusive lock on
+    ``<model>.lock``, re-reads the index so rows appended by other
+    processes are kept, writes the buffered vectors after them and only
+    then rewrites the index. A key therefore never points at unwritten
+    rows or at another text's vector. (Without fcntl, e.g. on Windows,
+    there is no lock and only one process should write.)
+    """
+
+    def __init__(self, directory: str, model_name: str, dim: int):
+        os.makedirs(directory, exist_ok=True)
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)
+        self.vectors_path = os.path.join(directory, f"{safe_name}.f32")
+        self.index_path = os.path.join(directory, f"{safe_name}.index.json")
+        self.lock_path = os.path.join(directory, f"{safe_name}.lock")
+        self.dim = dim
+
+        self.index: Dict[str, int] = {}
+        self._pending: Dict[str, np.ndarray] = {}
+        self.capacity = 0
+        self._map = None
+        self._reload()
+
+    def __len__(self):
+        return len(self.index) + len(self._pending)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _open_map(self):
+        return np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                         shape=(self.capacity, self.dim))
+
+    def _reload(self):
+        """Re-read the shared index and remap the vectors file if another process grew it"""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        file_size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        capacity = file_size // (self.dim * 4)
+        if capacity != self.capacity:
+            self._map = None
+            self.capacity = capacity
+            self._map = self._open_map() if capacity else None
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _grow(self, needed_rows: int):
+        new_capacity = max(needed_rows, self.capacity * 2, 1024)
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self.capacity = new_capacity
+        self._map = self._open_map()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        vector = self._pending.get(key)
+        if vector is not None:
+            return vector.copy()
+        row = self.index.get(key)
+        if row is None or row >= self.capacity:
+            return None
+        return np.array(self._map[row])
+
+    def put(self, key: str, vector: np.ndarray):
+        if key in self.index or key in self._pending:
+            return
+        self._pending[key] = np.asarray(vector, dtype=np.float32).copy()
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._locked():
+            self._reload()
+            new = [(key, vector) for key, vector in self._pending.items() if key not in self.index]
+            row = max(self.index.values(), default=-1) + 1
+            if row + len(new) > self.capacity:
+                self._grow(row + len(new))
+            for key, vector in new:
+                self._map[row] = vector
+                self.index[key] = row
+                row += 1
+            self._map.flush()
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, self.index_path)
+        self._pending.clear()
+
+class EmbeddingCache:
+    """Embedding cache keyed on normalized text plus model name.
+
+    A bounded in-memory LRU sits in front of an optional memory-mapped
+    on-disk store (EMBEDDING_CACHE_DIR), so a restarted worker starts warm.
+    Text is lowercased and whitespace-collapsed before keying; MiniLM's
+    tokenizer is uncased, so this does not change the embedding.
+    """
+
+    def __init__(self, model_name: str, dim: int = 384,
+                 max_entries: Optional[int] = None,
+                 cache_dir: Optional[str] = None,
+                 flush_every: int = 64):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max_entries or int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+        cache_dir = cache_dir or os.getenv("EMBEDDING_CACHE_DIR")
+        self.flush_every = flush_every
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.disk = DiskEmbeddingStore(cache_dir, model_name, dim) if cache_dir else None
+        if self.disk is not None:
+            print(f"💾 Embedding cache: {len(self.disk)} vectors on disk at {cache_dir}")
+            atexit.register(self.flush)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return ' '.join(text.lower().split())
+
+    def _key(self, text: str) -> str:
+        raw = f"{self.model_name}\x00{self.normalize(text)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return vector
+
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._remember(key, vector)
+                return vector
+
+        self.misses += 1
+        return None
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def encode(self, texts: List[str],
+               encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return float32 embeddings for texts, encoding only the misses in one batch"""
+        keys = [self._key(t) for t in texts]
+        vectors: List[Optional[np.ndarray]] = []
+
+        with self._lock:
+            for key in keys:
+                vectors.append(self._lookup(key))
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # Encode each distinct missing text once
+            unique_rows: Dict[str, int] = {}
+            unique_texts = []
+            for i in missing:
+                if keys[i] not in unique_rows:
+                    unique_rows[keys[i]] = len(unique_texts)
+                    unique_texts.append(texts[i])
+
+            encoded = np.asarray(encode_fn(unique_texts), dtype=np.float32)
+
+            with self._lock:
+                for key, row in unique_rows.items():
+                    self._remember(key, encoded[row].copy())
+                    if self.disk is not None:
+                        self.disk.put(key, encoded[row])
+                if self.disk is not None and self.disk.pending >= self.flush_every:
+                    self.disk.flush()
+
+            for i in missing:
+                vectors[i] = encoded[unique_rows[keys[i]]]
+
+        if not vectors:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack(vectors)
+
+    def flush(self):
+        """Persist pending on-disk entries"""
+        if self.disk is not None:
+            with self._lock:
+                self.disk.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'model': self.model_name,
+            'entries': len(self._memory),
+            'max_entries': self.max_entries,
+            'disk_entries': len(self.disk) if self.disk is not None else None,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_ratio': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,152 @@
+import asyncio
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from ingest_manifest import KBVersionWatcher
+
+class GraphContextCache:
+    """LRU cache of get_related_context results keyed on the section-id set.
+
+    The key is the sorted tuple of ids, so the same sections in any order
+    share an entry. The least recently used entries are evicted past
+    ``max_entries`` and everything is dropped when the knowledge-base
+    version changes. Concurrent misses for the same key (from threads or
+    from the event loop) wait on the first caller's query instead of
+    sending their own. Saved latency is the average miss latency counted
+    once per hit.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None,
+                 kb_watcher: Optional[KBVersionWatcher] = None):
+        self.max_entries = max_entries or int(os.getenv("GRAPH_CACHE_SIZE", "256"))
+        self.kb_watcher = kb_watcher or KBVersionWatcher()
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, ...], Dict[str, Any]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, ...], Future] = {}
+        self._kb_version = self.kb_watcher.current()
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.invalidations = 0
+        self._load_ms = 0.0
+        self._loads = 0
+        self.saved_ms = 0.0
+
+    @staticmethod
+    def key(section_ids: List[str]) -> Tuple[str, ...]:
+        return tuple(sorted(set(section_ids)))
+
+    def _check_kb_version(self):
+        version = self.kb_watcher.current()
+        if version != self._kb_version:
+            if self._entries:
+                print(f"♻️ Knowledge base changed ({self._kb_version} -> {version}), dropping graph cache")
+                self.invalidations += 1
+            self._entries.clear()
+            self._kb_version = version
+
+    def _claim(self, key: Tuple[str, ...]):
+        """(cached result, None), (None, future to wait on) or (None, None) to load it ourselves"""
+        with self._lock:
+            self._check_kb_version()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_ms += self._avg_load_ms()
+                return copy.copy(self._entries[key]), None
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.shared += 1
+                self.saved_ms += self._avg_load_ms()
+                return None, future
+            self.misses += 1
+            self._in_flight[key] = Future()
+            return None, None
+
+    def _avg_load_ms(self) -> float:
+        return self._load_ms / self._loads if self._loads else 0.0
+
+    def _finish(self, key: Tuple[str, ...], started: float,
+                result: Optional[Dict[str, Any]] = None,
+                error: Optional[BaseException] = None):
+        with self._lock:
+            future = self._in_flight.pop(key)
+            if error is None:
+                self._load_ms += (time.perf_counter() - started) * 1000
+                self._loads += 1
+                self._entries[key] = result
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        if error is None:
+            future.set_result(result)
+        else:
+            # Waiters shouldn't see the first caller's cancellation as their own
+            future.set_exception(error if isinstance(error, Exception)
+                                 else RuntimeError("Graph query was cancelled"))
+
+    def get(self, section_ids: List[str],
+            loader: Callable[[List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        """Cached related context, calling loader(section_ids) on a miss"""
+        key = self.key(section_ids)
+        cached, future = self._claim(key)
+        if cached is not None:
+            return cached
+        if future is not None:
+            return copy.copy(future.result())
+
+        started = time.perf_counter()
+        try:
+            result = loader(list(key))
+        except BaseException as e:
+            self._finish(key, started, error=e)
+            raise
+        self._finish(key, started, result)
+        return copy.copy(result)
+
+    async def aget(self, section_ids: List[str],
+                   loader: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Async version of get(); loader is a coroutine function"""
+        key = self.key(section_ids)
+        cached, future = self._claim(key)
+        if cached is not None:
+            return cached
+        if future is not None:
+            # Shielded so a waiter's timeout doesn't cancel the shared future;
+            # the callback marks its error as retrieved if nobody is left waiting
+            shared = asyncio.wrap_future(future)
+            shared.add_done_callback(lambda f: f.cancelled() or f.exception())
+            return copy.copy(await asyncio.shield(shared))
+
+        started = time.perf_counter()
+        try:
+            result = await loader(list(key))
+        except BaseException as e:
+            self._finish(key, started, error=e)
+            raise
+        self._finish(key, started, result)
+        return copy.copy(result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.shared + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'kb_version': self._kb_version,
+            'hits': self.hits,
+            'shared': self.shared,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_ratio': round((self.hits + self.shared) / lookups, 3) if lookups else 0.0,
+            'avg_query_ms': round(self._avg_load_ms(), 1),
+            'saved_ms': round(self.saved_ms, 1)
+        }
@@ -1,8 +1,17 @@
-from typing import List, Dict, Any
-from dataclasses import dataclass
-from pinecone_client import PineconeClient
+import os
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, field
+from local_vector_index import create_vector_client
 from neo4j_client import Neo4jClient
 from query_expander import QueryExpander
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from ingest_manifest import KBVersionWatcher
+from reranker import CrossEncoderReranker
+from token_budget import count_tokens, DEFAULT_CONTEXT_TOKENS
+from text_dedup import ShingleIndex
+from section_graph import SectionGraphSnapshot
+from graph_cache import GraphContextCache
 
 @dataclass
 class RetrievedContext:
@@ -10,14 +19,49 @@ class RetrievedContext:
     graph_context: Dict[str, Any]
     combined_context: str
     expanded_queries: List[str]
+    # Token count and packing summary of combined_context
+    context_stats: Dict[str, Any] = field(default_factory=dict)
 
 class EnhancedHybridRetriever:
     def __init__(self, pinecone_index: str = "pdf-knowledge-base"):
-        self.pinecone_client = PineconeClient(pinecone_index)
+        # PineconeClient or LocalVectorIndex (VECTOR_BACKEND)
+        self.pinecone_client = create_vector_client(pinecone_index)
         self.neo4j_client = Neo4jClient()
         self.query_expander = QueryExpander()
+        
+        # BM25 index written at ingest time, fused with the dense results (BM25_ENABLED=false to disable)
+        self.lexical_enabled = os.getenv("BM25_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.lexical_top_k = int(os.getenv("BM25_TOP_K", "5"))
+        self.kb_watcher = KBVersionWatcher()
+        self._lexical_index = None
+        self._lexical_version = None
+        self._lexical_lock = threading.Lock()
+        if self.lexical_enabled:
+            self._lexical()
+        
+        # In-memory Section hierarchy answering graph lookups without a Neo4j
+        # round trip (SECTION_GRAPH_ENABLED=false to query Neo4j per request)
+        self.section_graph_enabled = os.getenv("SECTION_GRAPH_ENABLED", "true").lower() in ("1", "true", "yes")
+        self._section_graph = None
+        self._section_graph_version = None
+        if self.section_graph_enabled:
+            self._graph_snapshot()
+        
+        # Neo4j related-context results by section-id set (GRAPH_CACHE_ENABLED=false to disable).
+        # It fronts the per-request Neo4j query, which only runs when the
+        # section graph is disabled or empty; while the snapshot answers
+        # lookups the cache stays idle (see graph_source() in /stats)
+        self.graph_cache = None
+        if os.getenv("GRAPH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"):
+            self.graph_cache = GraphContextCache(kb_watcher=self.kb_watcher)
+        
+        # Optional cross-encoder reordering of a wider candidate pool (RERANK_ENABLED)
+        self.reranker = None
+        if os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes"):
+            self.reranker = CrossEncoderReranker()
     
-    def retrieve(self, query: str, top_k: int = 8) -> RetrievedContext:
+    def retrieve(self, query: str, top_k: int = 8,
+                 token_budget: Optional[int] = None) -> RetrievedContext:
         """Perform enhanced hybrid retrieval with query expansion"""
         
         # 1. Expand query (but keep it focused)
@@ -26,22 +70,68 @@ class EnhancedHybridRetriever:
         print(f"📝 Expanded to {len(expanded_queries)} variations")
         
         # 2. Search with weighted approach
+        # Original query (top 5) plus the top 3 expansions (top 2 each),
+        # encoded together in a single batch
+        search_queries = [query] + expanded_queries[1:4]
+        top_ks = [5] + [2] * (len(search_queries) - 1)
+        if self.reranker is not None:
+            # Give the cross-encoder a wider pool from the original query
+            top_ks[0] = max(top_ks[0], self.reranker.candidates - sum(top_ks[1:]))
+        original_results, *expanded_results = self.pinecone_client.search_many(search_queries, top_ks)
+        
+        # 3. Remove duplicates and re-rank
+        candidates = self._candidate_count(top_k)
+        vector_results = self._merge_vector_results(original_results, expanded_results, candidates)
+        vector_results = self._fuse_lexical(query, vector_results, candidates)
+        if self.reranker is not None:
+            vector_results = self.reranker.rerank(query, vector_results, top_k)
+        
+        # 4. Extract Neo4j IDs from vector results
+        neo4j_ids = self._extract_neo4j_ids(vector_results)
+        
+        # 5. Get related context from Neo4j
+        graph_context = {}
+        if neo4j_ids:
+            graph_context = self._snapshot_context(neo4j_ids)
+            if graph_context is None:
+                try:
+                    if self.graph_cache is not None:
+                        graph_context = self.graph_cache.get(neo4j_ids, self.neo4j_client.get_related_context)
+                    else:
+                        graph_context = self.neo4j_client.get_related_context(neo4j_ids)
+                    print(f"📚 Retrieved {len(graph_context.get('context', []))} graph nodes")
+                except Exception as e:
+                    print(f"⚠️ Neo4j query error: {e}")
+                    graph_context = {'context': []}
+        
+        # 6. Combine context intelligently
+        combined_context, context_stats = self._build_intelligent_context(
+            query, vector_results, graph_context, token_budget
+        )
+        
+        return RetrievedContext(
+            vector_results=vector_results,
+            graph_context=graph_context,
+            combined_context=combined_context,
+            context_stats=context_stats,
+            expanded_queries=expanded_queries
+        )
+    
+    def _merge_vector_results(self, original_results: List[Any],
+                              expanded_results: List[List[Any]],
+                              top_k: int) -> List[Any]:
+        """Weight, deduplicate and rank matches from the original and expanded queries"""
         all_vector_results = []
         
-        # Original query gets highest weight
-        original_results = self.pinecone_client.search(query, top_k=5)
         for result in original_results:
             result.score = result.score * 1.5  # Boost original query
             all_vector_results.append(result)
         
-        # Expanded queries get lower weight
-        for expanded_query in expanded_queries[1:4]:  # Only top 3 expansions
-            results = self.pinecone_client.search(expanded_query, top_k=2)
+        for results in expanded_results:
             for result in results:
                 result.score = result.score * 0.8  # Lower weight
                 all_vector_results.append(result)
         
-        # 3. Remove duplicates and re-rank
         seen_ids = set()
         unique_results = []
         for result in all_vector_results:
@@ -61,94 +151,183 @@ class EnhancedHybridRetriever:
             score = r.score
             print(f"  {i}. {section[:60]}... (score: {score:.3f})")
         
-        # 4. Extract Neo4j IDs from vector results
+        return vector_results
+    
+    def _candidate_count(self, top_k: int) -> int:
+        """How many merged results to keep before the (optional) reranking stage"""
+        return max(top_k, self.reranker.candidates) if self.reranker is not None else top_k
+    
+    def _lexical_stale(self) -> bool:
+        return self._lexical_index is None or self.kb_watcher.current() != self._lexical_version
+    
+    def _lexical(self):
+        """The BM25 index, loaded at startup and reloaded whenever the knowledge base version changes"""
+        version = self.kb_watcher.current()
+        if self._lexical_index is None or version != self._lexical_version:
+            with self._lexical_lock:
+                # Another request may have finished the reload while this one waited
+                if self._lexical_index is None or version != self._lexical_version:
+                    self._lexical_index = BM25Index.load()
+                    self._lexical_version = version
+                    if self._lexical_index.ids:
+                        print(f"📖 Loaded BM25 index: {len(self._lexical_index.ids)} chunks")
+        return self._lexical_index
+    
+    def _graph_snapshot_stale(self) -> bool:
+        return self._section_graph is None or self.kb_watcher.current() != self._section_graph_version
+    
+    def _graph_snapshot(self) -> Optional[SectionGraphSnapshot]:
+        """The Section hierarchy, reloaded whenever the knowledge base version changes.
+        
+        Read from the file exported at ingest, or with a single Neo4j query
+        when there is none. None when neither has any sections.
+        """
+        version = self.kb_watcher.current()
+        if self._section_graph is None or version != self._section_graph_version:
+            self._section_graph_version = version
+            if SectionGraphSnapshot.exists():
+                self._section_graph = SectionGraphSnapshot.load()
+            else:
+                try:
+                    self._section_graph = SectionGraphSnapshot.from_neo4j(self.neo4j_client)
+                except Exception as e:
+                    print(f"⚠️ Could not load section graph from Neo4j: {e}")
+                    self._section_graph = SectionGraphSnapshot()
+            if len(self._section_graph):
+                print(f"🌳 Loaded section graph: {len(self._section_graph)} sections")
+        return self._section_graph if len(self._section_graph) else None
+    
+    def graph_source(self) -> str:
+        """Where graph context currently comes from: 'snapshot' or 'neo4j'"""
+        if self.section_graph_enabled and self._section_graph is not None and len(self._section_graph):
+            return 'snapshot'
+        return 'neo4j'
+    
+    def _snapshot_context(self, neo4j_ids: List[str]) -> Optional[Dict[str, Any]]:
+        """Related context from the in-memory snapshot, or None to ask Neo4j"""
+        if not self.section_graph_enabled:
+            return None
+        snapshot = self._graph_snapshot()
+        if snapshot is None:
+            return None
+        graph_context = snapshot.related_context(neo4j_ids)
+        print(f"📚 Retrieved {len(graph_context['context'])} graph nodes (snapshot)")
+        return graph_context
+    
+    def _fuse_lexical(self, query: str, vector_results: List[Any], top_k: int) -> List[Any]:
+        """Reciprocal-rank-fuse the dense results with BM25 hits for the original query"""
+        if not self.lexical_enabled:
+            return vector_results
+        lexical_results = self._lexical().search(query, self.lexical_top_k)
+        if not lexical_results:
+            return vector_results
+        
+        fused = reciprocal_rank_fusion(vector_results, lexical_results, top_k)
+        dense_ids = {r.id for r in vector_results}
+        added = [r for r in fused if r.id not in dense_ids]
+        print(f"🔤 BM25: {len(lexical_results)} hits, {len(added)} added by fusion")
+        return fused
+    
+    def _extract_neo4j_ids(self, vector_results: List[Any]) -> List[str]:
+        """Pick up to 5 distinct graph section ids referenced by the matches"""
         neo4j_ids = []
         for result in vector_results:
             if hasattr(result, 'metadata'):
                 meta = result.metadata
-                for field in ['section_id', 'parent_id', 'neo4j_id']:
-                    if field in meta and meta[field] and meta[field] != "ROOT":
-                        neo4j_ids.append(meta[field])
+                for key in ['section_id', 'parent_id', 'neo4j_id']:
+                    if key in meta and meta[key] and meta[key] != "ROOT":
+                        neo4j_ids.append(meta[key])
                         break
         
-        # 5. Get related context from Neo4j
-        graph_context = {}
-        if neo4j_ids:
-            try:
-                unique_ids = list(set(neo4j_ids))[:5]
-                graph_context = self.neo4j_client.get_related_context(unique_ids)
-                print(f"📚 Retrieved {len(graph_context.get('context', []))} graph nodes")
-            except Exception as e:
-                print(f"⚠️ Neo4j query error: {e}")
-                graph_context = {'context': []}
-        
-        # 6. Combine context intelligently
-        combined_context = self._build_intelligent_context(query, vector_results, graph_context)
-        
-        return RetrievedContext(
-            vector_results=vector_results,
-            graph_context=graph_context,
-            combined_context=combined_context,
-            expanded_queries=expanded_queries
-        )
+        return list(set(neo4j_ids))[:5]
     
     def _build_intelligent_context(self, original_query: str, 
                                  vector_results: List[Dict], 
-                                 graph_context: Dict) -> str:
-        """Build intelligent context with clear section attribution"""
+                                 graph_context: Dict,
+                                 token_budget: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """Build intelligent context with clear section attribution.
+        
+        Chunks are packed greedily in the order retrieval returns them
+        (score, fused or reranked order; at most 5 sections, 2 chunks
+        each) and then graph items (at most 3 sections, 1 item each) while
+        the context stays within token_budget tokens. Items whose text is
+        mostly already packed (shingle containment, see ShingleIndex) are
+        skipped, and graph items that repeat part of a packed chunk (a
+        chunk is its section's first 500 characters, the graph item the
+        first 1000) are trimmed to the part that is new. Returns the
+        context and a summary of what was packed.
+        """
+        token_budget = token_budget or DEFAULT_CONTEXT_TOKENS
         
         # CHANGE #1: Modified Context Header
-        context = f"""QUESTION TO ANSWER: "{original_query}"
+        header = f"""QUESTION TO ANSWER: "{original_query}"
 
 ===== COURSE MATERIAL RELEVANT TO THIS QUESTION =====
 
 """
+        footer = f"""===== END OF COURSE MATERIAL =====
+
+CRITICAL INSTRUCTIONS FOR ANSWERING:
+1. Provide a DIRECT, SPECIFIC answer to the question using ONLY the material above
+2. For comparison questions (like "differentiate between X and Y"):
+   - Create a clear comparison structure
+   - List specific characteristics of each item
+   - Highlight the key differences
+3. Always cite which section each piece of information comes from
+4. Do NOT just describe what sections contain - EXTRACT and SYNTHESIZE the answer
+5. If the material is insufficient, state what's missing clearly
+"""
+        separator = f"{'-'*70}\n\n"
+        used = count_tokens(header) + count_tokens(footer)
+        packed = ShingleIndex()
+        stats = {'budget': token_budget, 'chunks': 0, 'graph_items': 0, 'duplicates': 0,
+                 'trimmed': 0, 'dedup_tokens_saved': 0, 'over_budget': 0}
         
-        # Group results by section to avoid redundancy
+        # Greedily take the best-ranked chunks, grouped by section for display
         sections_map = {}
         for result in vector_results:
             meta = result.metadata
             full_section = meta.get('full_section', 'Unknown Section')
+            content = meta.get('text', '').strip()
+            if not content:
+                continue
             
-            if full_section not in sections_map:
-                sections_map[full_section] = {
-                    'chunks': [],
-                    'max_score': 0
-                }
+            section = sections_map.get(full_section)
+            if section is None and len(sections_map) >= 5:
+                continue
+            if section is not None and len(section['chunks']) >= 2:  # Max 2 chunks per section
+                continue
+            if packed.is_duplicate(content):
+                stats['duplicates'] += 1
+                stats['dedup_tokens_saved'] += count_tokens(content)
+                continue
             
-            sections_map[full_section]['chunks'].append({
-                'content': meta.get('text', ''),
-                'score': result.score,
-                'page': meta.get('page', 'N/A')
-            })
-            sections_map[full_section]['max_score'] = max(
-                sections_map[full_section]['max_score'], 
-                result.score
-            )
-        
-        # Sort sections by relevance
-        sorted_sections = sorted(
-            sections_map.items(), 
-            key=lambda x: x[1]['max_score'], 
-            reverse=True
-        )
+            block = f"{content}\n\n"
+            cost = count_tokens(block)
+            if section is None:
+                cost += count_tokens(f"[FROM: {full_section}]\n") + count_tokens(separator)
+            if used + cost > token_budget:
+                stats['over_budget'] += 1
+                continue
+            
+            if section is None:
+                section = sections_map[full_section] = {'chunks': []}
+            section['chunks'].append(block)
+            packed.add(content)
+            used += cost
+            stats['chunks'] += 1
         
         # CHANGE #2: Removed Excessive Section Formatting
         # Add sections in answer-friendly format (no excessive formatting)
-        for i, (section_path, data) in enumerate(sorted_sections[:5], 1):
-            # Simple section header
+        # Sections in the order of their best-ranked chunk
+        context = header
+        for section_path, data in sections_map.items():
             context += f"[FROM: {section_path}]\n"
-            
-            # Combine chunks from same section
-            for chunk in data['chunks'][:2]:  # Max 2 chunks per section
-                context += f"{chunk['content'].strip()}\n\n"
-            
-            context += f"{'-'*70}\n\n"
+            context += ''.join(data['chunks'])
+            context += separator
         
-        # Add graph context if available
+        # Add graph context if available, in whatever budget is left
         if graph_context and 'context' in graph_context and graph_context['context']:
-            context += "[RELATED INFORMATION FROM COURSE STRUCTURE]\n\n"
-            
             # Group by section
             graph_sections = {}
             for item in graph_context['context']:
@@ -157,28 +336,50 @@ class EnhancedHybridRetriever:
                     graph_sections[section] = []
                 graph_sections[section].append(item)
             
-            for section, items in list(graph_sections.items())[:3]:
-                context += f"[FROM: {section}]\n"
-                for item in items[:1]:  # Only 1 item per graph section
-                    if item.get('content'):
-                        context += f"{item['content'].strip()}\n\n"
+            graph_block = ""
+            graph_header = "[RELATED INFORMATION FROM COURSE STRUCTURE]\n\n"
+            # Header and separator are only paid for once an item is packed
+            frame_cost = count_tokens(graph_header) + count_tokens(separator)
+            # Up to 3 graph sections, 1 item each; duplicates don't use up a slot
+            for section, items in graph_sections.items():
+                if stats['graph_items'] >= 3:
+                    break
+                content = (items[0].get('content') or '').strip()
+                if not content:
+                    continue
+                # Section content often repeats a chunk's text verbatim
+                if packed.is_duplicate(content):
+                    stats['duplicates'] += 1
+                    stats['dedup_tokens_saved'] += count_tokens(content)
+                    continue
+                trimmed = packed.trim(content)
+                if not trimmed:
+                    stats['duplicates'] += 1
+                    stats['dedup_tokens_saved'] += count_tokens(content)
+                    continue
+                if trimmed != content:
+                    stats['trimmed'] += 1
+                    stats['dedup_tokens_saved'] += count_tokens(content) - count_tokens(trimmed)
+                    content = trimmed
+                block = f"[FROM: {section}]\n{content}\n\n"
+                cost = count_tokens(block) + (0 if graph_block else frame_cost)
+                if used + cost > token_budget:
+                    stats['over_budget'] += 1
+                    continue
+                graph_block += block
+                packed.add(content)
+                used += cost
+                stats['graph_items'] += 1
             
-            context += f"{'-'*70}\n\n"
-        
-        context += f"""===== END OF COURSE MATERIAL =====
-
-CRITICAL INSTRUCTIONS FOR ANSWERING:
-1. Provide a DIRECT, SPECIFIC answer to the question using ONLY the material above
-2. For comparison questions (like "differentiate between X and Y"):
-   - Create a clear comparison structure
-   - List specific characteristics of each item
-   - Highlight the key differences
-3. Always cite which section each piece of information comes from
-4. Do NOT just describe what sections contain - EXTRACT and SYNTHESIZE the answer
-5. If the material is insufficient, state what's missing clearly
-"""
+            if graph_block:
+                context += graph_header + graph_block + separator
         
-        return context
+        context += footer
+        stats['tokens'] = count_tokens(context)
+        print(f"🧮 Context: {stats['tokens']}/{token_budget} tokens, {stats['chunks']} chunks, "
+              f"{stats['graph_items']} graph items, {stats['duplicates']} duplicates skipped, "
+              f"{stats['trimmed']} trimmed ({stats['dedup_tokens_saved']} tokens saved)")
+        return context, stats
 
 # Backwards compatibility
 HybridRetriever = EnhancedHybridRetriever
\ No newline at end of file
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+MANIFEST_PATH = "data/processed/txt_manifest.json"
+
+def content_hash(payload: Any) -> str:
+    """Stable sha256 of a JSON-serializable payload"""
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def section_hash(section) -> str:
+    """Hash of exactly the section fields written to Neo4j"""
+    return content_hash({
+        'title': section.title[:200],
+        'content': section.content[:1000],
+        'level': section.level,
+        'full_path': ' > '.join(section.section_path),
+        'parent_id': section.parent_id
+    })
+
+def chunk_hash(chunk: Dict[str, Any]) -> str:
+    """Hash of a chunk's text and metadata as produced by create_chunks.
+
+    'page' is left out: it is the line number // 50, so one inserted line
+    would change it for every later chunk of the file.
+    """
+    metadata = {k: v for k, v in chunk['metadata'].items() if k != 'page'}
+    return content_hash({'text': chunk['text'], 'metadata': metadata})
+
+@dataclass
+class ManifestDiff:
+    changed_section_ids: List[str] = field(default_factory=list)
+    removed_section_ids: List[str] = field(default_factory=list)
+    changed_chunk_ids: List[str] = field(default_factory=list)
+    removed_chunk_ids: List[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.changed_section_ids or self.removed_section_ids or
+                    self.changed_chunk_ids or self.removed_chunk_ids)
+
+class IngestManifest:
+    """Per-source content hashes of every section and chunk that was ingested.
+
+    Replaces the old yes/no txt_processed.flag: a rerun diffs the freshly
+    parsed file against the manifest and only touches what changed. The
+    kb_version is a hash over all entries and changes whenever the
+    knowledge base does, so caches can use it for invalidation.
+    """
+
+    def __init__(self, sources: Optional[Dict[str, Dict[str, Dict[str, str]]]] = None):
+        # {source_file: {'sections': {id: hash}, 'chunks': {id: hash}}}
+        self.sources = sources or {}
+
+    @classmethod
+    def load(cls, path: str = MANIFEST_PATH) -> "IngestManifest":
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('sources', {}))
+
+    @property
+    def kb_version(self) -> str:
+        return content_hash(self.sources)[:16]
+
+    def has_source(self, source_file: str) -> bool:
+        return source_file in self.sources
+
+    def diff(self, source_file: str, sections: Dict[str, str], chunks: Dict[str, str]) -> ManifestDiff:
+        """Compare freshly computed hashes for one source against what was ingested"""
+        previous = self.sources.get(source_file, {'sections': {}, 'chunks': {}})
+        old_sections, old_chunks = previous['sections'], previous['chunks']
+
+        return ManifestDiff(
+            changed_section_ids=[sid for sid, h in sections.items() if old_sections.get(sid) != h],
+            removed_section_ids=[sid for sid in old_sections if sid not in sections],
+            changed_chunk_ids=[cid for cid, h in chunks.items() if old_chunks.get(cid) != h],
+            removed_chunk_ids=[cid for cid in old_chunks if cid not in chunks]
+        )
+
+    def update(self, source_file: str, sections: Dict[str, str], chunks: Dict[str, str]):
+        self.sources[source_file] = {'sections': dict(sections), 'chunks': dict(chunks)}
+
+    def save(self, path: str = MANIFEST_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'kb_version': self.kb_version,
+                'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'sources': self.sources
+            }, f, indent=1)
+        os.replace(tmp_path, path)
+
+def current_kb_version(path: str = MANIFEST_PATH) -> Optional[str]:
+    """kb_version recorded by the last ingest, or None if nothing was ingested"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('kb_version')
+    except (OSError, ValueError):
+        return None
+
+class KBVersionWatcher:
+    """Cheap kb_version lookups for request-time caches.
+
+    Only re-reads the manifest when its mtime changes, so checking the
+    version on every request costs a single stat().
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self._mtime = None
+        self._version = None
+
+    def current(self) -> Optional[str]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+        if mtime != self._mtime:
+            self._version = current_kb_version(self.path)
+            self._mtime = mtime
+        return self._version
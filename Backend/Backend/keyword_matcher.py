@@ -0,0 +1,68 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over a table of labelled keywords.
+
+    Built once from ``{label: [keyword, ...]}``. counts() walks the text a
+    single time, however many keywords there are, and returns how often
+    each label's keywords occur (substring matches, case-insensitive,
+    overlaps included).
+    """
+
+    def __init__(self, table: Dict[str, Iterable[str]]):
+        self.labels: List[str] = list(table)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for label_index, label in enumerate(self.labels):
+            for keyword in table[label]:
+                if keyword:
+                    self._add(keyword.lower(), label_index)
+        self._link()
+
+    def _add(self, keyword: str, label_index: int):
+        node = 0
+        for ch in keyword:
+            child = self._goto[node].get(ch)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][ch] = child
+            node = child
+        self._out[node].append(label_index)
+
+    def _link(self):
+        """Breadth-first failure links; each node also outputs its fallback's matches"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Keyword occurrences per label, for labels with at least one match"""
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = [0] * len(self.labels)
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for label_index in out[node]:
+                hits[label_index] += 1
+        return {self.labels[i]: n for i, n in enumerate(hits) if n}
+
+    def best(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """Label with the most matches (earlier labels win ties), or default"""
+        counts = self.counts(text)
+        if not counts:
+            return default
+        return max(counts, key=lambda label: (counts[label], -self.labels.index(label)))
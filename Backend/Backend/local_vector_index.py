@@ -0,0 +1,365 @@
+import asyncio
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from embedding_cache import EmbeddingCache
+from batch_uploader import UploadReport
+from pinecone_client import PineconeClient, VectorMatch, chunk_metadata
+from ingest_manifest import KBVersionWatcher
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+class LocalIndexState:
+    """One consistent snapshot of the local index: vectors, ids, metadata, HNSW graph.
+
+    Searches read ``LocalVectorIndex.state`` once and use only that object,
+    so a reload or a write that publishes a new state never mixes rows of
+    one version with ids or metadata of another.
+    """
+
+    def __init__(self, vectors: np.ndarray, scales: Optional[np.ndarray],
+                 ids: List[str], metadata: List[Dict[str, Any]]):
+        self.vectors = vectors
+        self.scales = scales
+        self.ids = ids
+        self.metadata = metadata
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self.hnsw = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def matrix(self) -> np.ndarray:
+        """Dequantized float32 view of all live rows"""
+        n = len(self.ids)
+        if self.scales is not None:
+            return self.vectors[:n].astype(np.float32) * self.scales[:n, None]
+        return self.vectors[:n]
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Dot product of the query with every live row"""
+        n = len(self.ids)
+        if self.scales is not None:
+            # Scale the n scores rather than dequantizing the n x dim matrix
+            return (self.vectors[:n] @ query) * self.scales[:n]
+        return self.vectors[:n] @ query
+
+    def build_hnsw(self, dim: int):
+        n = len(self.ids)
+        self.hnsw = hnswlib.Index(space='ip', dim=dim)
+        self.hnsw.init_index(max_elements=max(n, 1), ef_construction=200, M=16)
+        if n:
+            self.hnsw.add_items(self.matrix(), np.arange(n))
+        self.hnsw.set_ef(64)
+
+class LocalVectorIndex:
+    """In-process replacement for PineconeClient.
+
+    Vectors are L2-normalized and kept in a memory-mapped matrix under
+    ``index_dir``, either float32 or int8 with one float32 scale per row
+    (LOCAL_INDEX_DTYPE). Ids and metadata live in a side table written next
+    to it. Search is an exact dot product over the matrix, or an HNSW graph
+    when LOCAL_INDEX_HNSW is set and hnswlib is installed. Scores are
+    cosine similarities, like the Pinecone index.
+
+    Writes never touch the mapped files: they work on a private copy and
+    save() writes new files that are os.replace()d into place, so readers
+    in other processes keep their old mapping until they reload. Searches
+    reload when the knowledge-base version changes, so a running API sees
+    what a separate ingest process wrote.
+    """
+
+    def __init__(self, index_name: str = "pdf-knowledge-base",
+                 index_dir: Optional[str] = None,
+                 dtype: Optional[str] = None,
+                 use_hnsw: Optional[bool] = None,
+                 dim: int = 384):
+        self.index_name = index_name
+        self.dim = dim
+        self.dtype = (dtype or os.getenv("LOCAL_INDEX_DTYPE", "float32")).lower()
+        if self.dtype not in ("float32", "int8"):
+            raise ValueError("LOCAL_INDEX_DTYPE must be float32 or int8")
+        if use_hnsw is None:
+            use_hnsw = os.getenv("LOCAL_INDEX_HNSW", "false").lower() in ("1", "true", "yes")
+        if use_hnsw and hnswlib is None:
+            print("⚠️ LOCAL_INDEX_HNSW set but hnswlib is not installed, using exact search")
+        self.use_hnsw = use_hnsw and hnswlib is not None
+
+        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_cache = EmbeddingCache('all-MiniLM-L6-v2', dim=dim)
+
+        self.index_dir = os.path.join(index_dir or os.getenv("LOCAL_INDEX_DIR", "data/local_index"), index_name)
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.index_dir, f"vectors.{'i8' if self.dtype == 'int8' else 'f32'}")
+        self.scales_path = os.path.join(self.index_dir, "scales.f32")
+        self.table_path = os.path.join(self.index_dir, "metadata.json")
+        self._np_dtype = np.int8 if self.dtype == 'int8' else np.float32
+
+        self.kb_watcher = KBVersionWatcher()
+        self._reload_lock = threading.Lock()
+        version = self.kb_watcher.current()
+        self.state = self._load()
+        self._kb_version = version
+        if self.state is None:
+            # An ingest is swapping files right now; the first search retries
+            self.state = LocalIndexState(np.zeros((0, dim), dtype=self._np_dtype),
+                                         np.zeros(0, dtype=np.float32) if self.dtype == 'int8' else None,
+                                         [], [])
+            self._kb_version = object()
+        print(f"📦 Local vector index '{index_name}': {len(self.state)} vectors ({self.dtype}, "
+              f"{'hnsw' if self.use_hnsw else 'exact'} search)")
+
+    @property
+    def ids(self) -> List[str]:
+        return self.state.ids
+
+    # --- storage ---------------------------------------------------------
+
+    def _map(self, path: str, dtype, shape) -> np.ndarray:
+        if not shape[0]:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+    def _load(self) -> Optional[LocalIndexState]:
+        """State read from disk, or None if the files are mid-replace and disagree"""
+        ids: List[str] = []
+        metadata: List[Dict[str, Any]] = []
+        if os.path.exists(self.table_path):
+            with open(self.table_path, 'r', encoding='utf-8') as f:
+                table = json.load(f)
+            if table.get('dtype', self.dtype) != self.dtype:
+                raise ValueError(f"Local index at {self.index_dir} was built as {table['dtype']}, "
+                                 f"not {self.dtype}; rebuild it with process_txt_pipeline.py --full")
+            ids, metadata = table['ids'], table['metadata']
+
+        n = len(ids)
+        item_size = np.dtype(self._np_dtype).itemsize
+        on_disk = os.path.getsize(self.vectors_path) // (self.dim * item_size) if os.path.exists(self.vectors_path) else 0
+        if self.dtype == 'int8':
+            on_disk = min(on_disk, os.path.getsize(self.scales_path) // 4 if os.path.exists(self.scales_path) else 0)
+        if on_disk < n:
+            return None
+
+        state = LocalIndexState(
+            self._map(self.vectors_path, self._np_dtype, (n, self.dim)),
+            self._map(self.scales_path, np.float32, (n,)) if self.dtype == 'int8' else None,
+            ids, metadata
+        )
+        if self.use_hnsw:
+            state.build_hnsw(self.dim)
+        return state
+
+    def _refresh(self):
+        """Reload when another process (ingest) has published a new knowledge base version"""
+        if self.kb_watcher.current() == self._kb_version:
+            return
+        with self._reload_lock:
+            version = self.kb_watcher.current()
+            if version == self._kb_version:
+                return
+            state = self._load()
+            if state is None:
+                # Caught between two file replacements; try again next search
+                return
+            self.state = state
+            self._kb_version = version
+            print(f"📦 Reloaded local vector index '{self.index_name}': {len(state)} vectors")
+
+    def _writable(self) -> LocalIndexState:
+        """Private in-memory copy of the current state for upsert/delete"""
+        state = self.state
+        n = len(state)
+        return LocalIndexState(
+            np.array(state.vectors[:n]),
+            np.array(state.scales[:n]) if state.scales is not None else None,
+            list(state.ids), list(state.metadata)
+        )
+
+    def _write_row(self, state: LocalIndexState, row: int, vector: np.ndarray):
+        if row >= len(state.vectors):
+            # Grow geometrically so appends stay amortized O(1)
+            capacity = max(row + 1, 2 * len(state.vectors), 1024)
+            state.vectors = np.resize(state.vectors, (capacity, self.dim))
+            if state.scales is not None:
+                state.scales = np.resize(state.scales, capacity)
+        if state.scales is not None:
+            scale = float(np.abs(vector).max()) / 127 or 1.0
+            state.vectors[row] = np.round(vector / scale).astype(np.int8)
+            state.scales[row] = scale
+        else:
+            state.vectors[row] = vector
+
+    def _replace_file(self, path: str, array: np.ndarray):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.ascontiguousarray(array).tofile(f)
+        os.replace(tmp_path, path)
+
+    def save(self, state: LocalIndexState):
+        """Write state to new files, swap them into place and publish it"""
+        n = len(state)
+        self._replace_file(self.vectors_path, state.vectors[:n])
+        if state.scales is not None:
+            self._replace_file(self.scales_path, state.scales[:n])
+        # The table goes last: until it lands, readers see more rows than ids
+        # (fine) rather than ids without rows
+        tmp_path = self.table_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dtype': self.dtype, 'ids': state.ids, 'metadata': state.metadata}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.table_path)
+
+        state.vectors = state.vectors[:n]
+        if state.scales is not None:
+            state.scales = state.scales[:n]
+        if self.use_hnsw:
+            state.build_hnsw(self.dim)
+        self.state = state
+
+    # --- PineconeClient interface -----------------------------------------
+
+    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Create embeddings for texts (cached by normalized text)"""
+        return self.embed(texts).tolist()
+
+    def embed(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Encode texts to a float32 matrix, going through the embedding cache"""
+        return self.embedding_cache.encode(
+            texts,
+            lambda missing: self.embedding_model.encode(missing, batch_size=batch_size)
+        )
+
+    def upsert_chunks(self, chunks: List[Any], encode_batch_size: int = None) -> UploadReport:
+        """Embed chunks and write them into the local index"""
+        encode_batch_size = encode_batch_size or int(os.getenv("EMBED_BATCH_SIZE", "128"))
+        report = UploadReport()
+        state = self._writable()
+
+        for start in range(0, len(chunks), encode_batch_size):
+            batch_chunks = chunks[start:start + encode_batch_size]
+            embeddings = self.embed([chunk.text for chunk in batch_chunks], encode_batch_size)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.where(norms == 0, 1, norms)
+
+            for chunk, embedding in zip(batch_chunks, embeddings):
+                row = state.rows.get(chunk.chunk_id)
+                if row is None:
+                    row = len(state.ids)
+                    state.ids.append(chunk.chunk_id)
+                    state.metadata.append({})
+                    state.rows[chunk.chunk_id] = row
+                self._write_row(state, row, embedding)
+                state.metadata[row] = chunk_metadata(chunk)
+            report.batches_ok += 1
+            report.items_ok += len(batch_chunks)
+            print(f"  Embedded {min(start + encode_batch_size, len(chunks))}/{len(chunks)} chunks")
+
+        self.save(state)
+        self.embedding_cache.flush()
+        print(f"Upserted {report.items_ok} vectors to local index ({len(state)} total)")
+        return report
+
+    def delete_chunks(self, chunk_ids: List[str]) -> None:
+        """Delete vectors, moving the last row into each freed slot"""
+        state = self._writable()
+        deleted = 0
+        for chunk_id in chunk_ids:
+            row = state.rows.pop(chunk_id, None)
+            if row is None:
+                continue
+            last = len(state.ids) - 1
+            if row != last:
+                state.vectors[row] = state.vectors[last]
+                if state.scales is not None:
+                    state.scales[row] = state.scales[last]
+                state.ids[row] = state.ids[last]
+                state.metadata[row] = state.metadata[last]
+                state.rows[state.ids[row]] = row
+            state.ids.pop()
+            state.metadata.pop()
+            deleted += 1
+
+        if deleted:
+            self.save(state)
+            print(f"Deleted {deleted} vectors from local index")
+
+    def delete_source(self, source_file: str) -> None:
+        """Delete every vector of one source file, whatever id scheme wrote it"""
+        prefix = f"{source_file}_"
+        self.delete_chunks([chunk_id for chunk_id in self.ids if chunk_id.startswith(prefix)])
+
+    def query(self, embedding: Any, top_k: int = 5) -> List[VectorMatch]:
+        """Search with a precomputed query embedding"""
+        self._refresh()
+        state = self.state
+        n = len(state)
+        if not n:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        top_k = min(top_k, n)
+
+        if state.hnsw is not None:
+            labels, distances = state.hnsw.knn_query(query, k=top_k)
+            rows, scores = labels[0], 1 - distances[0]
+        else:
+            all_scores = state.scores(query)
+            rows = np.argpartition(-all_scores, top_k - 1)[:top_k]
+            rows = rows[np.argsort(-all_scores[rows])]
+            scores = all_scores[rows]
+
+        return [
+            VectorMatch(id=state.ids[row], score=float(score), metadata=dict(state.metadata[row]))
+            for row, score in zip(rows, scores)
+        ]
+
+    def search(self, query: str, top_k: int = 5) -> List[VectorMatch]:
+        """Search for similar chunks"""
+        return self.query(self.embed([query])[0], top_k)
+
+    def search_many(self, queries: List[str], top_ks: List[int]) -> List[List[VectorMatch]]:
+        """Search several queries, encoding all of them in one batched forward pass"""
+        if not queries:
+            return []
+        query_embeddings = self.embed(queries)
+        return [self.query(embedding, top_k) for embedding, top_k in zip(query_embeddings, top_ks)]
+
+class AsyncLocalVectorIndex:
+    """AsyncPineconeClient interface over a LocalVectorIndex.
+
+    Searches take microseconds, so they run inline; only encoding goes to
+    a worker thread.
+    """
+
+    def __init__(self, local_index: LocalVectorIndex, timeout: float = 10.0):
+        self.pinecone_client = local_index
+
+    async def close(self):
+        pass
+
+    async def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.pinecone_client.create_embeddings, texts)
+
+    async def query(self, embedding: List[float], top_k: int = 5) -> List[VectorMatch]:
+        return self.pinecone_client.query(embedding, top_k)
+
+    async def search(self, query: str, top_k: int = 5) -> List[VectorMatch]:
+        query_embedding = (await self.create_embeddings([query]))[0]
+        return await self.query(query_embedding, top_k)
+
+def create_vector_client(index_name: str = "pdf-knowledge-base"):
+    """PineconeClient or LocalVectorIndex, depending on VECTOR_BACKEND"""
+    backend = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+    if backend == "local":
+        return LocalVectorIndex(index_name)
+    if backend != "pinecone":
+        raise ValueError("VECTOR_BACKEND must be pinecone or local")
+    return PineconeClient(index_name)
@@ -1,6 +1,6 @@
-from neo4j import GraphDatabase
-import os
 from dotenv import load_dotenv
+from neo4j_connection import get_connection_manager
+from graph_schema import ensure_schema, DOCUMENT_SCHEMA
 from typing import List, Dict, Any
 import warnings
 
@@ -9,25 +9,57 @@ warnings.filterwarnings("ignore")
 
 load_dotenv()
 
+# Sections matching the ids plus up to two levels of subsections
+RELATED_CONTEXT_QUERY = """
+MATCH (s:Section)
+WHERE s.id IN $section_ids
+OPTIONAL MATCH (s)-[:HAS_SUBSECTION*0..2]->(sub:Section)
+WITH COLLECT(DISTINCT s) + COLLECT(DISTINCT sub) as all_sections
+UNWIND all_sections as section
+RETURN DISTINCT 
+    section.id as section_id,
+    section.title as section_title,
+    section.full_path as section_path,
+    section.level as section_level,
+    section.content as content
+ORDER BY section.level
+"""
+
+def _records_to_context(records) -> Dict[str, Any]:
+    """Shape related-context records into the dict the retriever expects"""
+    context_data = []
+    
+    for record in records:
+        # Only add if content exists
+        if record.get('content'):
+            context_data.append({
+                'section_id': record['section_id'],
+                'section_title': record['section_title'],
+                'section_path': record['section_path'],
+                'section_level': record['section_level'],
+                'content': record['content']
+            })
+    
+    return {'context': context_data}
+
 class Neo4jClient:
     def __init__(self):
-        self.uri = os.getenv("NEO4J_URI")
-        self.user = os.getenv("NEO4J_USERNAME")
-        self.password = os.getenv("NEO4J_PASSWORD")
-        self.database = os.getenv("NEO4J_DATABASE", "neo4j")
-        
-        self.driver = GraphDatabase.driver(
-            self.uri,
-            auth=(self.user, self.password),
-            notifications_min_severity='OFF'  # Suppress Neo4j notifications
-        )
+        # Driver and connection pool are shared process-wide
+        self.connections = get_connection_manager()
+        self.database = self.connections.database
+    
+    @property
+    def driver(self):
+        # Looked up on every use: the manager rebuilds its driver after a close()
+        return self.connections.driver
     
     def close(self):
-        self.driver.close()
+        """No-op: the shared pool is closed by whoever owns the process (the API lifespan)"""
     
     def create_knowledge_graph(self, documents: List[Dict]) -> None:
         """Create knowledge graph from structured documents"""
-        with self.driver.session(database=self.database) as session:
+        ensure_schema(self.connections.driver, DOCUMENT_SCHEMA, self.database)
+        with self.connections.write_session() as session:
             # Clear existing data (optional)
             session.run("MATCH (n) DETACH DELETE n")
             
@@ -102,41 +134,34 @@ class Neo4jClient:
     
     def get_related_context(self, section_ids: List[str]) -> Dict[str, Any]:
         """Get related context from knowledge graph"""
-        with self.driver.session(database=self.database) as session:
+        with self.connections.read_session() as session:
             # Updated query to match ACTUAL Neo4j structure (Section nodes with content)
-            query = """
-            MATCH (s:Section)
-            WHERE s.id IN $section_ids
-            OPTIONAL MATCH (s)-[:HAS_SUBSECTION*0..2]->(sub:Section)
-            WITH COLLECT(DISTINCT s) + COLLECT(DISTINCT sub) as all_sections
-            UNWIND all_sections as section
-            RETURN DISTINCT 
-                section.id as section_id,
-                section.title as section_title,
-                section.full_path as section_path,
-                section.level as section_level,
-                section.content as content
-            ORDER BY section.level
-            """
-            
-            result = session.run(query, section_ids=section_ids)
-            context_data = []
-            
-            for record in result:
-                # Only add if content exists
-                if record.get('content'):
-                    context_data.append({
-                        'section_id': record['section_id'],
-                        'section_title': record['section_title'],
-                        'section_path': record['section_path'],
-                        'section_level': record['section_level'],
-                        'content': record['content']
-                    })
-            
-            return {'context': context_data}
+            result = session.run(RELATED_CONTEXT_QUERY, section_ids=section_ids)
+            return _records_to_context(result)
     
     def query_graph(self, cypher_query: str, params: Dict = None) -> List[Dict]:
         """Execute custom Cypher query"""
-        with self.driver.session(database=self.database) as session:
+        with self.connections.write_session() as session:
             result = session.run(cypher_query, params or {})
-            return [dict(record) for record in result]
\ No newline at end of file
+            return [dict(record) for record in result]
+
+class AsyncNeo4jClient:
+    """asyncio counterpart of Neo4jClient for the read path"""
+    
+    def __init__(self):
+        self.connections = get_connection_manager()
+        self.database = self.connections.database
+    
+    @property
+    def driver(self):
+        return self.connections.async_driver
+    
+    async def close(self):
+        """No-op: the shared pool is closed by whoever owns the process (the API lifespan)"""
+    
+    async def get_related_context(self, section_ids: List[str]) -> Dict[str, Any]:
+        """Get related context from knowledge graph"""
+        async with self.connections.async_read_session() as session:
+            result = await session.run(RELATED_CONTEXT_QUERY, section_ids=section_ids)
+            records = [record async for record in result]
+            return _records_to_context(records)
\ No newline at end of file
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from neo4j import GraphDatabase, AsyncGraphDatabase, READ_ACCESS, WRITE_ACCESS
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def driver_settings() -> Dict[str, Any]:
+    """Connection pool configuration shared by every driver"""
+    return {
+        'max_connection_pool_size': int(os.getenv("NEO4J_POOL_SIZE", "50")),
+        # Seconds to wait for a free connection before the query fails
+        'connection_acquisition_timeout': float(os.getenv("NEO4J_ACQUIRE_TIMEOUT", "10")),
+        # Connections idle for longer than this are pinged before reuse
+        'liveness_check_timeout': float(os.getenv("NEO4J_LIVENESS_CHECK", "30")),
+        # Recycle connections before Aura's load balancer drops them
+        'max_connection_lifetime': float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "2700")),
+        'keep_alive': True,
+        'notifications_min_severity': 'OFF'
+    }
+
+class GraphConnectionManager:
+    """Process-wide Neo4j drivers and their connection pools.
+
+    One sync and one async driver are created on first use and shared by
+    every client, so requests reuse pooled connections instead of paying
+    a TLS and bolt handshake each. Read sessions use READ_ACCESS so a
+    cluster routes them to readers. prewarm() opens connections up front.
+    """
+
+    def __init__(self, uri: Optional[str] = None, user: Optional[str] = None,
+                 password: Optional[str] = None, database: Optional[str] = None):
+        self.uri = uri or os.getenv("NEO4J_URI")
+        self.user = user or os.getenv("NEO4J_USERNAME")
+        self.password = password or os.getenv("NEO4J_PASSWORD")
+        self.database = database or os.getenv("NEO4J_DATABASE", "neo4j")
+        self.settings = driver_settings()
+
+        self._lock = threading.Lock()
+        self._driver = None
+        self._async_driver = None
+        self.prewarmed = 0
+
+    @property
+    def driver(self):
+        with self._lock:
+            if self._driver is None:
+                self._driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password), **self.settings)
+            return self._driver
+
+    @property
+    def async_driver(self):
+        with self._lock:
+            if self._async_driver is None:
+                self._async_driver = AsyncGraphDatabase.driver(self.uri, auth=(self.user, self.password), **self.settings)
+            return self._async_driver
+
+    def read_session(self):
+        return self.driver.session(database=self.database, default_access_mode=READ_ACCESS)
+
+    def write_session(self):
+        return self.driver.session(database=self.database, default_access_mode=WRITE_ACCESS)
+
+    def async_read_session(self):
+        return self.async_driver.session(database=self.database, default_access_mode=READ_ACCESS)
+
+    def _prewarm_count(self, connections: Optional[int]) -> int:
+        connections = connections or int(os.getenv("NEO4J_PREWARM_CONNECTIONS", "4"))
+        return min(connections, self.settings['max_connection_pool_size'])
+
+    def _ping(self):
+        with self.read_session() as session:
+            session.run("RETURN 1").consume()
+
+    def prewarm(self, connections: Optional[int] = None) -> int:
+        """Open connections on the sync driver by running concurrent pings"""
+        connections = self._prewarm_count(connections)
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            for future in [pool.submit(self._ping) for _ in range(connections)]:
+                future.result()
+        self.prewarmed = connections
+        print(f"🔌 Neo4j pool pre-warmed with {connections} connections")
+        return connections
+
+    async def _aping(self):
+        async with self.async_read_session() as session:
+            result = await session.run("RETURN 1")
+            await result.consume()
+
+    async def aprewarm(self, connections: Optional[int] = None) -> int:
+        """Async version of prewarm(), for the async driver"""
+        connections = self._prewarm_count(connections)
+        await asyncio.gather(*[self._aping() for _ in range(connections)])
+        self.prewarmed = connections
+        print(f"🔌 Neo4j pool pre-warmed with {connections} connections")
+        return connections
+
+    def close(self):
+        with self._lock:
+            driver, self._driver = self._driver, None
+        if driver is not None:
+            driver.close()
+
+    async def aclose(self):
+        with self._lock:
+            driver, self._async_driver = self._async_driver, None
+        if driver is not None:
+            await driver.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'database': self.database,
+            'pool_size': self.settings['max_connection_pool_size'],
+            'acquire_timeout': self.settings['connection_acquisition_timeout'],
+            'liveness_check': self.settings['liveness_check_timeout'],
+            'max_connection_lifetime': self.settings['max_connection_lifetime'],
+            'prewarmed': self.prewarmed,
+            'sync_driver': self._driver is not None,
+            'async_driver': self._async_driver is not None
+        }
+
+_manager: Optional[GraphConnectionManager] = None
+_manager_lock = threading.Lock()
+
+def get_connection_manager() -> GraphConnectionManager:
+    """The process-wide GraphConnectionManager, configured from the environment"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = GraphConnectionManager()
+        return _manager
@@ -1,89 +1,212 @@
-from neo4j import GraphDatabase
-from typing import List
+import os
+from typing import List, Dict, Any, Optional, Set
 from txt_processor import DocumentSection
+from neo4j_connection import GraphConnectionManager, get_connection_manager
+from graph_schema import ensure_schema, SECTION_SCHEMA
 
 class TXTNeo4jBuilder:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri=None, user=None, password=None, batch_size: int = None):
+        # The process-wide pool, unless explicit credentials ask for another server
+        self._owns_connections = bool(uri or user or password)
+        if self._owns_connections:
+            self.connections = GraphConnectionManager(uri, user, password)
+        else:
+            self.connections = get_connection_manager()
+        # Rows per UNWIND transaction
+        self.batch_size = batch_size or int(os.getenv("NEO4J_WRITE_BATCH_SIZE", "500"))
+        # Title terms shared by more sections than this are skipped when pairing
+        self.max_term_sections = int(os.getenv("RELATED_MAX_TERM_SECTIONS", "50"))
+    
+    @property
+    def driver(self):
+        return self.connections.driver
     
     def close(self):
-        self.driver.close()
+        """Close a private pool; the shared one is left to the process owner"""
+        if self._owns_connections:
+            self.connections.close()
+    
+    def ensure_constraints(self) -> List[str]:
+        """Unique Section.id so MERGE lookups are index-backed instead of label scans"""
+        return ensure_schema(self.connections.driver, SECTION_SCHEMA, self.connections.database)
     
     def build_graph_from_sections(self, sections: List[DocumentSection]):
         """Build proper hierarchical graph from parsed sections"""
-        with self.driver.session() as session:
-            # Clear existing
-            session.run("MATCH (n) DETACH DELETE n")
-            
+        # Clear existing sections of these files only; other sources stay in the graph
+        for source_file in sorted({s.source_file for s in sections}):
+            self.delete_source_sections(source_file)
+        
+        self.ensure_constraints()
+        with self.connections.write_session() as session:
             print(f"Building graph from {len(sections)} sections...")
+            self._write_sections(session, sections)
             
-            # Create all section nodes
-            for section in sections:
-                session.run("""
-                MERGE (s:Section {
-                    id: $id,
-                    title: $title,
-                    content: $content,
-                    level: $level,
-                    full_path: $full_path
-                })
-                SET s.type = CASE 
-                    WHEN $level = 1 THEN 'chapter'
-                    WHEN $level <= 3 THEN 'section' 
-                    ELSE 'content'
-                END
-                """, 
-                id=section.id,
-                title=section.title[:200],
-                content=section.content[:1000],  # Store first 1000 chars
-                level=section.level,
-                full_path=' > '.join(section.section_path)
-                )
+            # Create content similarity relationships
+            self._create_content_relationships(session, sections)
+    
+    def upsert_sections(self, changed: List[DocumentSection], all_sections: List[DocumentSection]):
+        """MERGE only the changed sections, leaving the rest of the graph online"""
+        if not changed:
+            return
+        self.ensure_constraints()
+        with self.connections.write_session() as session:
+            changed_ids = [s.id for s in changed]
             
-            # Create hierarchical relationships
-            relationships = 0
-            for section in sections:
-                if section.parent_id:
-                    session.run("""
-                    MATCH (parent:Section {id: $parent_id})
-                    MATCH (child:Section {id: $child_id})
-                    MERGE (parent)-[:HAS_SUBSECTION]->(child)
-                    """, 
-                    parent_id=section.parent_id,
-                    child_id=section.id
-                    )
-                    relationships += 1
-                
-                # Create NEXT relationship for reading order
-                # (Find previous section at same level)
+            # Parent and RELATED edges of changed sections are rebuilt below
+            session.run("""
+            MATCH (:Section)-[r:HAS_SUBSECTION]->(s:Section)
+            WHERE s.id IN $ids
+            DELETE r
+            """, ids=changed_ids)
+            session.run("""
+            MATCH (s:Section)-[r:RELATED]-(:Section)
+            WHERE s.id IN $ids
+            DELETE r
+            """, ids=changed_ids)
             
-            print(f"Created {relationships} hierarchical relationships")
+            print(f"Updating {len(changed)} changed sections...")
+            self._write_sections(session, changed)
             
-            # Create content similarity relationships
-            self._create_content_relationships(session, sections)
+            self._create_content_relationships(session, all_sections, set(changed_ids))
+    
+    def delete_sections(self, section_ids: List[str]):
+        """Remove sections that no longer exist in the source"""
+        if not section_ids:
+            return
+        with self.connections.write_session() as session:
+            session.run("""
+            MATCH (s:Section)
+            WHERE s.id IN $ids
+            DETACH DELETE s
+            """, ids=section_ids)
+        print(f"Deleted {len(section_ids)} removed sections")
+    
+    def delete_source_sections(self, source_file: str):
+        """Remove every section of one source file, whatever id scheme wrote it"""
+        with self.connections.write_session() as session:
+            deleted = session.run("""
+            MATCH (s:Section)
+            WHERE s.id STARTS WITH $prefix
+            DETACH DELETE s
+            RETURN count(*) AS deleted
+            """, prefix=f"{source_file}_").single()['deleted']
+        print(f"Cleared {deleted} existing sections of {source_file}")
+    
+    def _write_sections(self, session, sections: List[DocumentSection]):
+        """MERGE section nodes by id and link them to their parents, in UNWIND batches"""
+        section_rows = [
+            {
+                'id': section.id,
+                'title': section.title[:200],
+                'content': section.content[:1000],  # Store first 1000 chars
+                'level': section.level,
+                'full_path': ' > '.join(section.section_path)
+            }
+            for section in sections
+        ]
+        for batch in self._batches(section_rows):
+            session.execute_write(self._merge_section_rows, batch)
+        
+        # Create hierarchical relationships
+        edge_rows = [
+            {'parent_id': section.parent_id, 'child_id': section.id}
+            for section in sections if section.parent_id
+        ]
+        for batch in self._batches(edge_rows):
+            session.execute_write(self._merge_edge_rows, batch)
+        
+        print(f"Created {len(edge_rows)} hierarchical relationships "
+              f"({len(section_rows)} sections in batches of {self.batch_size})")
+    
+    def _batches(self, rows: List[Dict[str, Any]]):
+        for i in range(0, len(rows), self.batch_size):
+            yield rows[i:i + self.batch_size]
+    
+    @staticmethod
+    def _merge_section_rows(tx, rows: List[Dict[str, Any]]):
+        tx.run("""
+        UNWIND $rows AS row
+        MERGE (s:Section {id: row.id})
+        SET s.title = row.title,
+            s.content = row.content,
+            s.level = row.level,
+            s.full_path = row.full_path,
+            s.type = CASE 
+                WHEN row.level = 1 THEN 'chapter'
+                WHEN row.level <= 3 THEN 'section' 
+                ELSE 'content'
+            END
+        """, rows=rows)
+    
+    @staticmethod
+    def _merge_edge_rows(tx, rows: List[Dict[str, Any]]):
+        tx.run("""
+        UNWIND $rows AS row
+        MATCH (parent:Section {id: row.parent_id})
+        MATCH (child:Section {id: row.child_id})
+        MERGE (parent)-[:HAS_SUBSECTION]->(child)
+        """, rows=rows)
     
-    def _create_content_relationships(self, session, sections: List[DocumentSection]):
-        """Create relationships based on content similarity"""
+    def _create_content_relationships(self, session, sections: List[DocumentSection],
+                                      changed_ids: Optional[Set[str]] = None):
+        """Create relationships based on content similarity
+        
+        With changed_ids, only pairs involving at least one changed section
+        are (re)linked.
+        """
         # For chapters and major sections, find related content
         major_sections = [s for s in sections if s.level <= 3 and len(s.content) > 50]
         
         print(f"Creating content relationships for {len(major_sections)} major sections...")
         
-        # Simple keyword-based relationships
-        for i, section1 in enumerate(major_sections):
-            for section2 in major_sections[i+1:]:
-                # Extract key terms (simple approach)
-                terms1 = set(section1.title.lower().split()[:5])
-                terms2 = set(section2.title.lower().split()[:5])
-                common = terms1.intersection(terms2)
-                
-                if len(common) >= 2:  # At least 2 common terms
-                    session.run("""
-                    MATCH (s1:Section {id: $id1})
-                    MATCH (s2:Section {id: $id2})
-                    MERGE (s1)-[:RELATED {common_terms: $terms}]->(s2)
-                    """,
-                    id1=section1.id,
-                    id2=section2.id,
-                    terms=list(common)
-                    )
\ No newline at end of file
+        rows = []
+        for (i, j), common in self._title_term_pairs(major_sections).items():
+            section1, section2 = major_sections[i], major_sections[j]
+            if changed_ids is not None and section1.id not in changed_ids and section2.id not in changed_ids:
+                continue
+            if len(common) >= 2:  # At least 2 common terms
+                rows.append({'id1': section1.id, 'id2': section2.id, 'terms': sorted(common)})
+        
+        for batch in self._batches(rows):
+            session.execute_write(self._merge_related_rows, batch)
+        
+        print(f"Created {len(rows)} RELATED relationships")
+    
+    @staticmethod
+    def _title_terms(title: str) -> Set[str]:
+        """Key terms of a title (simple approach: its first 5 lowercased words)"""
+        return set(title.lower().split()[:5])
+    
+    def _title_term_pairs(self, sections: List[DocumentSection]) -> Dict[tuple, Set[str]]:
+        """Shared title terms for every candidate pair of sections.
+        
+        Candidate pairs come from an inverted index (term -> section
+        positions), so only sections that share a term are ever compared.
+        Terms in more than max_term_sections titles would make that
+        quadratic, so they don't generate candidates; they still count
+        towards the shared terms of a pair found through a rarer term.
+        """
+        terms = [self._title_terms(section.title) for section in sections]
+        postings: Dict[str, List[int]] = {}
+        for position, section_terms in enumerate(terms):
+            for term in section_terms:
+                postings.setdefault(term, []).append(position)
+        
+        candidates: Set[tuple] = set()
+        for term, positions in postings.items():
+            if len(positions) > self.max_term_sections:
+                continue
+            for a in range(len(positions)):
+                for b in range(a + 1, len(positions)):
+                    candidates.add((positions[a], positions[b]))
+        
+        return {(i, j): terms[i] & terms[j] for i, j in sorted(candidates)}
+    
+    @staticmethod
+    def _merge_related_rows(tx, rows: List[Dict[str, Any]]):
+        tx.run("""
+        UNWIND $rows AS row
+        MATCH (s1:Section {id: row.id1})
+        MATCH (s2:Section {id: row.id2})
+        MERGE (s1)-[:RELATED {common_terms: row.terms}]->(s2)
+        """, rows=rows)
\ No newline at end of file
@@ -1,15 +1,43 @@
 import os
-from typing import List, Dict, Any
+import asyncio
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+import httpx
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
+from embedding_cache import EmbeddingCache
+from batch_uploader import PipelinedUploader, UploadReport
 
 load_dotenv()
 
+@dataclass
+class VectorMatch:
+    """Search hit with the same attributes as a Pinecone SDK match.
+
+    ``score`` is the cosine similarity, None for a hit that only BM25
+    found; ``fused_score`` is set by reciprocal_rank_fusion.
+    """
+    id: str
+    score: Optional[float]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    fused_score: Optional[float] = None
+
+def chunk_metadata(chunk: Any) -> Dict[str, Any]:
+    """Metadata stored with each chunk vector"""
+    return {
+        **chunk.metadata,
+        'text': chunk.text[:500],  # Store first 500 chars for reference
+        'neo4j_id': f"section_{hash(' > '.join(chunk.section_path)) % 1000000}",
+        'type': 'document_chunk'
+    }
+
 class PineconeClient:
     def __init__(self, index_name: str = "pdf-knowledge-base"):
         self.api_key = os.getenv("PINECONE_API_KEY")
         self.index_name = index_name
         self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_cache = EmbeddingCache('all-MiniLM-L6-v2', dim=384)
         
         # NEW: Initialize Pinecone with new API
         from pinecone import Pinecone, ServerlessSpec
@@ -36,36 +64,71 @@ class PineconeClient:
         self.index = self.pc.Index(index_name)
     
     def create_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Create embeddings for texts"""
-        embeddings = self.embedding_model.encode(texts)
-        return embeddings.tolist()
+        """Create embeddings for texts (cached by normalized text)"""
+        return self.embed(texts).tolist()
     
-    def upsert_chunks(self, chunks: List[Any]) -> None:
-        """Upsert document chunks to Pinecone"""
-        vectors = []
+    def embed(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Encode texts to a float32 matrix, going through the embedding cache"""
+        return self.embedding_cache.encode(
+            texts,
+            lambda missing: self.embedding_model.encode(missing, batch_size=batch_size)
+        )
+    
+    def upsert_chunks(self, chunks: List[Any], encode_batch_size: int = None) -> UploadReport:
+        """Embed and upsert document chunks to Pinecone.
+        
+        Chunks are encoded in batches of encode_batch_size (EMBED_BATCH_SIZE,
+        default 128). Every 100 vectors are handed to a PipelinedUploader,
+        whose threads upload them while the next batch is being encoded.
+        Returns the uploader's report, including ids of failed vectors.
+        """
+        encode_batch_size = encode_batch_size or int(os.getenv("EMBED_BATCH_SIZE", "128"))
+        upsert_batch_size = 100
         
-        for chunk in chunks:
-            embedding = self.create_embeddings([chunk.text])[0]
+        with PipelinedUploader(lambda batch: self.index.upsert(vectors=batch)) as uploader:
+            pending = []
+            for start in range(0, len(chunks), encode_batch_size):
+                batch_chunks = chunks[start:start + encode_batch_size]
+                embeddings = self.embed([chunk.text for chunk in batch_chunks], encode_batch_size)
+                
+                for chunk, embedding in zip(batch_chunks, embeddings):
+                    pending.append(self._chunk_vector(chunk, embedding))
+                    if len(pending) == upsert_batch_size:
+                        uploader.submit(pending)
+                        pending = []
+                
+                print(f"  Embedded {min(start + encode_batch_size, len(chunks))}/{len(chunks)} chunks")
             
-            vector = {
-                'id': chunk.chunk_id,
-                'values': embedding,
-                'metadata': {
-                    **chunk.metadata,
-                    'text': chunk.text[:500],  # Store first 500 chars for reference
-                    'neo4j_id': f"section_{hash(' > '.join(chunk.section_path)) % 1000000}",
-                    'type': 'document_chunk'
-                }
-            }
-            vectors.append(vector)
+            uploader.submit(pending)
         
-        # Upsert in batches
-        batch_size = 100
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i + batch_size]
-            self.index.upsert(vectors=batch)
+        self.embedding_cache.flush()
         
-        print(f"Upserted {len(vectors)} vectors to Pinecone")
+        report = uploader.report
+        print(f"Upserted {report.items_ok} vectors to Pinecone "
+              f"({report.batches_failed} failed batches, {report.retries} retries)")
+        return report
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> None:
+        """Delete vectors for chunks that no longer exist"""
+        batch_size = 1000
+        for i in range(0, len(chunk_ids), batch_size):
+            self.index.delete(ids=chunk_ids[i:i + batch_size])
+        
+        if chunk_ids:
+            print(f"Deleted {len(chunk_ids)} vectors from Pinecone")
+    
+    def delete_source(self, source_file: str) -> None:
+        """Delete every vector of one source file, whatever id scheme wrote it"""
+        chunk_ids = [chunk_id for page in self.index.list(prefix=f"{source_file}_") for chunk_id in page]
+        self.delete_chunks(chunk_ids)
+    
+    def _chunk_vector(self, chunk: Any, embedding: np.ndarray) -> Dict[str, Any]:
+        """Pinecone vector payload for one chunk (float32 -> list only here)"""
+        return {
+            'id': chunk.chunk_id,
+            'values': embedding.tolist(),
+            'metadata': chunk_metadata(chunk)
+        }
     
     def search(self, query: str, top_k: int = 5) -> List[Dict]:
         """Search for similar chunks"""
@@ -77,4 +140,69 @@ class PineconeClient:
             include_metadata=True
         )
         
-        return results['matches']
\ No newline at end of file
+        return results['matches']
+    
+    def search_many(self, queries: List[str], top_ks: List[int]) -> List[List[Dict]]:
+        """Search several queries, encoding all of them in one batched forward pass"""
+        if not queries:
+            return []
+        
+        query_embeddings = self.create_embeddings(queries)
+        
+        return [
+            self.index.query(
+                vector=embedding,
+                top_k=top_k,
+                include_metadata=True
+            )['matches']
+            for embedding, top_k in zip(query_embeddings, top_ks)
+        ]
+
+class AsyncPineconeClient:
+    """Queries the Pinecone index over async HTTP.
+
+    Reuses the embedding model and index of a PineconeClient; only the
+    network round trip to the index's data plane is done with httpx.
+    """
+    
+    def __init__(self, pinecone_client: PineconeClient, timeout: float = 10.0):
+        self.pinecone_client = pinecone_client
+        host = pinecone_client.pc.describe_index(pinecone_client.index_name).host
+        self.http = httpx.AsyncClient(
+            base_url=f"https://{host}",
+            headers={
+                'Api-Key': pinecone_client.api_key,
+                'X-Pinecone-API-Version': '2024-07'
+            },
+            timeout=timeout
+        )
+    
+    async def close(self):
+        await self.http.aclose()
+    
+    async def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Encode on a worker thread so the event loop isn't blocked"""
+        return await asyncio.to_thread(self.pinecone_client.create_embeddings, texts)
+    
+    async def query(self, embedding: List[float], top_k: int = 5) -> List[VectorMatch]:
+        """Search the index with a precomputed query embedding"""
+        response = await self.http.post('/query', json={
+            'vector': embedding,
+            'topK': top_k,
+            'includeMetadata': True
+        })
+        response.raise_for_status()
+        
+        return [
+            VectorMatch(
+                id=match['id'],
+                score=match['score'],
+                metadata=match.get('metadata', {})
+            )
+            for match in response.json().get('matches', [])
+        ]
+    
+    async def search(self, query: str, top_k: int = 5) -> List[VectorMatch]:
+        """Search for similar chunks"""
+        query_embedding = (await self.create_embeddings([query]))[0]
+        return await self.query(query_embedding, top_k)
\ No newline at end of file
@@ -0,0 +1,157 @@
+import os
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+from query_expander import QueryExpander
+
+STOPWORDS = {
+    'what', 'which', 'who', 'whom', 'when', 'where', 'why', 'how', 'is', 'are', 'was',
+    'were', 'be', 'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'about', 'does', 'do', 'did', 'can', 'could', 'should',
+    'would', 'it', 'its', 'this', 'that', 'these', 'those', 'me', 'my', 'you', 'your',
+    'explain', 'describe', 'define', 'definition', 'meant', 'mean', 'meaning', 'tell',
+    'give', 'list', 'discuss', 'briefly', 'detail', 'please', 'between', 'difference'
+}
+
+def _terms(text: str) -> List[str]:
+    return [t for t in re.findall(r'[a-z0-9]+', text.lower()) if t not in STOPWORDS and len(t) > 2]
+
+class LocalPreValidator:
+    """Decides clear-cut sufficiency cases from retrieval signals alone.
+
+    Signals: the top (merged) Pinecone score, the fraction of the question's
+    content terms found in the top chunks, the number of distinct sections
+    that cleared the low score threshold, and whether the top section's
+    title is exactly the question's key concept. Only ambiguous cases go
+    on to the LLM validator. Hits only BM25 found have no similarity score
+    and are left out of the score-based signals.
+
+    Scores are the merged ones from EnhancedHybridRetriever, so the original
+    query's matches carry the 1.5x boost; thresholds are on that scale.
+    LLM verdicts on ambiguous cases are recorded via observe() and
+    suggested_thresholds() derives thresholds that would never have
+    contradicted them.
+    """
+
+    def __init__(self, low_score: Optional[float] = None,
+                 high_score: Optional[float] = None,
+                 title_score: Optional[float] = None,
+                 min_overlap: Optional[float] = None,
+                 query_expander: Optional[QueryExpander] = None,
+                 max_observations: int = 1000):
+        self.low_score = low_score or float(os.getenv("PREVALIDATE_LOW_SCORE", "0.45"))
+        self.high_score = high_score or float(os.getenv("PREVALIDATE_HIGH_SCORE", "1.05"))
+        self.title_score = title_score or float(os.getenv("PREVALIDATE_TITLE_SCORE", "0.8"))
+        self.min_overlap = min_overlap or float(os.getenv("PREVALIDATE_MIN_OVERLAP", "0.6"))
+        self.query_expander = query_expander or QueryExpander()
+
+        self._lock = threading.Lock()
+        self._observations = deque(maxlen=max_observations)
+        self.clearly_sufficient = 0
+        self.clearly_insufficient = 0
+        self.ambiguous = 0
+
+    def features(self, question: str, vector_results: List[Any]) -> Dict[str, Any]:
+        """Retrieval signals the decision is based on"""
+        question_terms = set(_terms(question))
+        top = vector_results[:3]
+
+        found = set()
+        for result in top:
+            meta = result.metadata
+            found.update(_terms(f"{meta.get('title', '')} {meta.get('text', '')}"))
+        # None when the question has no content terms to compare ("What is AI?")
+        overlap = len(question_terms & found) / len(question_terms) if question_terms else None
+
+        # BM25-only hits (score None) have no similarity to compare
+        dense = [r for r in vector_results if r.score is not None]
+        covered_sections = {
+            r.metadata.get('full_section', r.id) for r in dense if r.score >= self.low_score
+        }
+
+        top_title = ' '.join(_terms(dense[0].metadata.get('title', ''))) if dense else ''
+        key_concepts = set(self.query_expander._extract_key_concepts(question.lower()))
+        key_concepts.add(' '.join(_terms(question)))
+
+        return {
+            'top_score': max((r.score for r in dense), default=0.0),
+            'lexical_overlap': round(overlap, 3) if overlap is not None else None,
+            'section_coverage': len(covered_sections),
+            'title_match': bool(top_title) and top_title in key_concepts
+        }
+
+    def assess(self, question: str, retrieved_context: Any) -> Optional[Dict[str, Any]]:
+        """Validation result for clear-cut cases, or None when the LLM should decide"""
+        f = self.features(question, retrieved_context.vector_results)
+        overlap = f['lexical_overlap']
+        summary = (f"top score {f['top_score']:.2f}, "
+                   f"term overlap {'n/a' if overlap is None else format(overlap, '.0%')}, "
+                   f"{f['section_coverage']} section(s) covered")
+
+        if f['top_score'] < self.low_score or overlap == 0:
+            with self._lock:
+                self.clearly_insufficient += 1
+            return self._result(2, False, f, f"Retrieval signals clearly insufficient ({summary})")
+
+        title_hit = f['title_match'] and f['top_score'] >= self.title_score
+        strong_hit = (f['top_score'] >= self.high_score and f['section_coverage'] >= 2)
+        # Without question terms there is nothing to confirm the match, so leave it to the LLM
+        if (title_hit or strong_hit) and overlap is not None and overlap >= self.min_overlap:
+            with self._lock:
+                self.clearly_sufficient += 1
+            reason = "top section title matches the question's key concept" if title_hit else "strong matches"
+            return self._result(8, True, f, f"Retrieval signals clearly sufficient: {reason} ({summary})")
+
+        with self._lock:
+            self.ambiguous += 1
+        return None
+
+    def _result(self, score: int, sufficient: bool, features: Dict[str, Any], reasoning: str) -> Dict[str, Any]:
+        return {
+            "completeness_score": score,
+            "can_fully_answer": sufficient,
+            "topic_directly_discussed": sufficient,
+            "substantial_content_present": sufficient,
+            "reasoning": reasoning,
+            "what_is_available": "See retrieved sources",
+            "what_is_missing": "Unknown" if sufficient else "The course materials do not appear to cover this topic",
+            "validated_by": "local",
+            "local_features": features
+        }
+
+    def observe(self, question: str, retrieved_context: Any, llm_score: int):
+        """Record the LLM verdict for an ambiguous case, for threshold calibration"""
+        f = self.features(question, retrieved_context.vector_results)
+        with self._lock:
+            self._observations.append((f['top_score'], f['lexical_overlap'], llm_score >= 7))
+
+    def suggested_thresholds(self) -> Dict[str, Any]:
+        """Tightest thresholds that agree with every observed LLM verdict"""
+        with self._lock:
+            observations = list(self._observations)
+        sufficient = [score for score, _, ok in observations if ok]
+        insufficient = [score for score, _, ok in observations if not ok]
+        return {
+            'samples': len(observations),
+            # Below the weakest sufficient case the LLM never said yes
+            'low_score': round(min(sufficient), 3) if sufficient else None,
+            # Above the strongest insufficient case the LLM never said no
+            'high_score': round(max(insufficient), 3) if insufficient else None
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        decisions = self.clearly_sufficient + self.clearly_insufficient + self.ambiguous
+        return {
+            'thresholds': {
+                'low_score': self.low_score,
+                'high_score': self.high_score,
+                'title_score': self.title_score,
+                'min_overlap': self.min_overlap
+            },
+            'clearly_sufficient': self.clearly_sufficient,
+            'clearly_insufficient': self.clearly_insufficient,
+            'ambiguous': self.ambiguous,
+            'llm_skipped_ratio': round((decisions - self.ambiguous) / decisions, 3) if decisions else 0.0,
+            'suggested': self.suggested_thresholds()
+        }
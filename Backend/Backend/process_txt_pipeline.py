@@ -1,13 +1,31 @@
 import os
+import sys
+from dataclasses import dataclass
 from dotenv import load_dotenv
 from txt_processor import TXTStructureParser
 from neo4j_txt_builder import TXTNeo4jBuilder
-from pinecone_client import PineconeClient
+from neo4j_connection import get_connection_manager
+from local_vector_index import create_vector_client
+from ingest_manifest import IngestManifest, section_hash, chunk_hash
+from bm25_index import BM25Index
+from section_graph import SectionGraphSnapshot
 
 load_dotenv()
 
-def process_txt_file(txt_path: str):
-    """Complete pipeline for TXT file"""
+@dataclass
+class PineconeChunk:
+    chunk_id: str
+    text: str
+    metadata: dict
+    section_path: list
+
+def process_txt_file(txt_path: str, full_rebuild: bool = False):
+    """Complete pipeline for TXT file
+    
+    Only sections and chunks whose content hash differs from the ingest
+    manifest are written; pass full_rebuild=True (or --full) to clear this
+    file's sections and vectors and re-upload everything.
+    """
     print(f"Processing TXT file: {txt_path}")
     
     if not os.path.exists(txt_path):
@@ -17,6 +35,7 @@ def process_txt_file(txt_path: str):
     # 1. Parse TXT structure
     parser = TXTStructureParser()
     sections = parser.parse_txt_file(txt_path)
+    source_file = os.path.basename(txt_path)
     
     # Display sample
     print("\nSample sections parsed:")
@@ -26,57 +45,99 @@ def process_txt_file(txt_path: str):
         print(f"   Content: {section.content[:100]}...")
         print()
     
-    # 2. Build Neo4j graph
-    print("Building Neo4j knowledge graph...")
-    neo4j = TXTNeo4jBuilder(
-        uri=os.getenv("NEO4J_URI"),
-        user=os.getenv("NEO4J_USERNAME"),
-        password=os.getenv("NEO4J_PASSWORD")
-    )
-    neo4j.build_graph_from_sections(sections)
-    neo4j.close()
-    
-    # 3. Create chunks for Pinecone
-    print("Creating vector embeddings...")
     chunks = parser.create_chunks(sections)
     
-    # 4. Upload to Pinecone
-    pinecone = PineconeClient()
+    # 2. Diff against the manifest of the previous ingest
+    manifest = IngestManifest.load()
+    section_hashes = {s.id: section_hash(s) for s in sections}
+    chunk_hashes = {c['id']: chunk_hash(c) for c in chunks}
+    
+    diff = manifest.diff(source_file, section_hashes, chunk_hashes)
+    # Without a manifest entry the graph and vector store may still hold this
+    # file under older ids, so it is rebuilt from scratch like --full
+    rebuild_source = full_rebuild or not manifest.has_source(source_file)
+    if rebuild_source:
+        diff.changed_section_ids = list(section_hashes)
+        diff.changed_chunk_ids = list(chunk_hashes)
     
-    # Convert chunks to format Pinecone expects
-    from dataclasses import dataclass
+    print(f"\nChanges since last ingest: "
+          f"{len(diff.changed_section_ids)} sections changed, {len(diff.removed_section_ids)} removed; "
+          f"{len(diff.changed_chunk_ids)} chunks changed, {len(diff.removed_chunk_ids)} removed")
     
-    @dataclass
-    class PineconeChunk:
-        chunk_id: str
-        text: str
-        metadata: dict
-        section_path: list
+    if diff.is_empty:
+        if not BM25Index.exists():
+            update_lexical_index(source_file, chunks)
+        if not SectionGraphSnapshot.exists():
+            update_section_graph(source_file, sections)
+        print("✅ Knowledge base already up to date")
+        return
     
-    pinecone_chunks = []
-    for chunk in chunks:
-        pc_chunk = PineconeChunk(
+    # 3. Update Neo4j graph
+    print("Updating Neo4j knowledge graph...")
+    neo4j = TXTNeo4jBuilder()
+    if rebuild_source:
+        neo4j.build_graph_from_sections(sections)
+    else:
+        changed_sections = set(diff.changed_section_ids)
+        neo4j.upsert_sections([s for s in sections if s.id in changed_sections], sections)
+        neo4j.delete_sections(diff.removed_section_ids)
+    neo4j.close()
+    # This script owns the process, so it also shuts the shared pool down
+    get_connection_manager().close()
+    
+    # 4. Upload changed chunks to Pinecone, delete removed ones
+    print("Creating vector embeddings...")
+    pinecone = create_vector_client()
+    
+    if rebuild_source:
+        pinecone.delete_source(source_file)
+    
+    changed_chunks = set(diff.changed_chunk_ids)
+    pinecone_chunks = [
+        PineconeChunk(
             chunk_id=chunk['id'],
             text=chunk['text'],
             metadata=chunk['metadata'],
             section_path=chunk['section_path']
         )
-        pinecone_chunks.append(pc_chunk)
+        for chunk in chunks if chunk['id'] in changed_chunks
+    ]
     
-    pinecone.upsert_chunks(pinecone_chunks)
+    report = pinecone.upsert_chunks(pinecone_chunks)
+    pinecone.delete_chunks(diff.removed_chunk_ids)
     
-    # 5. Save processing flag
-    os.makedirs("data/processed", exist_ok=True)
-    with open("data/processed/txt_processed.flag", "w") as f:
-        f.write("processed")
+    # 5. Rebuild this file's part of the BM25 index and the section graph snapshot
+    update_lexical_index(source_file, chunks)
+    update_section_graph(source_file, sections)
+    
+    # 6. Save manifest; failed uploads are left out so the next run retries them
+    for chunk_id in report.failed_ids:
+        chunk_hashes.pop(chunk_id, None)
+    manifest.update(source_file, section_hashes, chunk_hashes)
+    manifest.save()
     
     print("\n" + "="*60)
     print("✅ TXT Processing Complete!")
-    print(f"   - Parsed {len(sections)} hierarchical sections")
-    print(f"   - Created {len(chunks)} vector chunks")
+    print(f"   - Parsed {len(sections)} hierarchical sections ({len(diff.changed_section_ids)} written)")
+    print(f"   - Created {len(chunks)} vector chunks ({report.items_ok} embedded, {report.items_failed} failed)")
+    print(f"   - Knowledge base version: {manifest.kb_version}")
     print("="*60)
 
+def update_lexical_index(source_file: str, chunks: list):
+    """Replace source_file's chunks in the serialized BM25 index"""
+    print("Building BM25 lexical index...")
+    bm25 = BM25Index.load()
+    bm25.replace_source(source_file, chunks)
+    bm25.save()
+
+def update_section_graph(source_file: str, sections: list):
+    """Replace source_file's sections in the exported section hierarchy"""
+    print("Exporting section graph snapshot...")
+    snapshot = SectionGraphSnapshot.load()
+    snapshot.replace_source(source_file, sections)
+    snapshot.save()
+
 if __name__ == "__main__":
     # Update this path to your TXT file
     txt_file = "data/txts/combined_book.txt"  # ← CHANGE THIS!
-    process_txt_file(txt_file)
\ No newline at end of file
+    process_txt_file(txt_file, full_rebuild="--full" in sys.argv)
\ No newline at end of file
@@ -1,5 +1,6 @@
-from typing import List, Dict
+from typing import List
 import re
+from keyword_matcher import KeywordMatcher
 
 class QueryExpander:
     def __init__(self):
@@ -14,6 +15,8 @@ class QueryExpander:
             'ethnography': ['digital ethnography', 'online ethnography', 'netnography'],
             'experiment': ['online experiment', 'digital experiment', 'web experiment'],
         }
+        # Finds every concept in one pass over the query
+        self.concept_matcher = KeywordMatcher({concept: [concept] for concept in self.concept_mappings})
         
         # Question pattern recognition
         self.question_patterns = {
@@ -23,6 +26,24 @@ class QueryExpander:
             'explanation': r'explain|why|how does',
             'list': r'list|enumerate|what are the'
         }
+        
+        # Wording that only makes sense against the previous turn
+        self.follow_up_pattern = re.compile(
+            r"^(and|also|so|then|what about|how about|why is that|what else)\b"
+            r"|\b(tell me more|more detail|elaborate|explain further|another example"
+            r"|you said|you mentioned|the above|the previous|earlier)\b",
+            re.IGNORECASE
+        )
+        # A pronoun only points back at the previous turn in a short question
+        # that opens with it ("its limits?", "why is it used?"); longer
+        # questions usually name their own subject
+        self.follow_up_pronoun_pattern = re.compile(
+            r"^((what|why|how|where|when|who|which)\s+"
+            r"(is|are|was|were|does|do|did|can|could|should|would|will)\s+)?"
+            r"(it|its|they|them|their|these|those|this|that|he|she|his|her)\b",
+            re.IGNORECASE
+        )
+        self.follow_up_max_words = 6
     
     def expand_query(self, query: str) -> List[str]:
         """Expand query with FOCUSED variations - not too broad"""
@@ -72,6 +93,15 @@ class QueryExpander:
         # Return max 4 queries (original + 3 expansions)
         return unique_expanded[:4]
     
+    def is_follow_up(self, query: str) -> bool:
+        """Whether the question leans on the conversation so far ("what about its limits?")"""
+        query = query.strip()
+        if self.follow_up_pattern.search(query):
+            return True
+        if len(re.findall(r'[a-z]+', query.lower())) > self.follow_up_max_words:
+            return False
+        return bool(self.follow_up_pronoun_pattern.match(query))
+    
     def _detect_query_type(self, query: str) -> str:
         """Detect the type of question being asked"""
         for qtype, pattern in self.question_patterns.items():
@@ -80,26 +110,6 @@ class QueryExpander:
         return 'general'
     
     def _extract_key_concepts(self, query: str) -> List[str]:
-        """Extract key concepts from query"""
-        # Remove stop words
-        stopwords = {'what', 'is', 'the', 'a', 'an', 'and', 'or', 'but', 
-                    'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
-                    'how', 'does', 'do', 'are', 'explain', 'describe'}
-        
-        words = query.lower().split()
-        
-        # Look for known concepts (multi-word phrases first)
-        found_concepts = []
-        
-        # Check for multi-word concepts
-        for concept in self.concept_mappings.keys():
-            if concept in query:
-                found_concepts.append(concept)
-        
-        # Check for single words
-        for word in words:
-            if word not in stopwords and len(word) > 3:
-                if word in self.concept_mappings:
-                    found_concepts.append(word)
-        
-        return list(set(found_concepts))
\ No newline at end of file
+        """Known concepts mentioned in the query, most frequent first"""
+        counts = self.concept_matcher.counts(query)
+        return sorted(counts, key=counts.get, reverse=True)
\ No newline at end of file
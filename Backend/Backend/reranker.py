@@ -0,0 +1,135 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+from sentence_transformers import CrossEncoder
+
+class CrossEncoderReranker:
+    """Reorders retrieval candidates with a cross-encoder under a time budget.
+
+    All (query, chunk) pairs of a request are scored in one batched
+    predict() on a small worker pool. If the scores aren't back within
+    ``budget_ms``, or every worker is still busy, recent batches have been slower
+    than the budget, or the model raises, the caller's heuristic order is
+    kept.
+    Only the order changes; each result keeps its retrieval score.
+    """
+
+    def __init__(self, model_name: Optional[str] = None,
+                 budget_ms: Optional[float] = None,
+                 candidates: Optional[int] = None,
+                 workers: Optional[int] = None):
+        self.model_name = model_name or os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+        self.budget_ms = budget_ms or float(os.getenv("RERANK_BUDGET_MS", "150"))
+        self.candidates = candidates or int(os.getenv("RERANK_CANDIDATES", "16"))
+        self.workers = workers or int(os.getenv("RERANK_WORKERS", "2"))
+        self.model = CrossEncoder(self.model_name, max_length=256)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="reranker")
+        # One slot per worker, held while a batch is scoring; only ever
+        # acquired without blocking so requests never queue behind each other
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._lock = threading.Lock()
+        self._avg_ms = 0.0
+
+        self.reranked = 0
+        self.timeouts = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def _pairs(self, query: str, results: List[Any]) -> List[List[str]]:
+        return [
+            [query, f"{r.metadata.get('title', '')}. {r.metadata.get('text', '')}"]
+            for r in results
+        ]
+
+    def _predict(self, pairs: List[List[str]]):
+        started = time.perf_counter()
+        try:
+            return self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._avg_ms = elapsed if not self._avg_ms else 0.8 * self._avg_ms + 0.2 * elapsed
+            self._slots.release()
+
+    def _submit(self, query: str, results: List[Any]):
+        """Start scoring, or return None when it can't finish inside the budget"""
+        if len(results) < 2:
+            return None
+        if not self._slots.acquire(blocking=False):
+            return self._skip()
+        if self._avg_ms > 2 * self.budget_ms:
+            self._slots.release()
+            return self._skip()
+        try:
+            return self._executor.submit(self._predict, self._pairs(query, results))
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _skip(self):
+        with self._lock:
+            self.skipped += 1
+            # Let the average decay so a one-off slow batch doesn't disable reranking
+            self._avg_ms *= 0.9
+        return None
+
+    def _ordered(self, results: List[Any], scores, top_k: int) -> List[Any]:
+        with self._lock:
+            self.reranked += 1
+        order = sorted(range(len(results)), key=lambda i: float(scores[i]), reverse=True)
+        return [results[i] for i in order[:top_k]]
+
+    def _timed_out(self, results: List[Any], top_k: int) -> List[Any]:
+        with self._lock:
+            self.timeouts += 1
+        print(f"⏱️ Reranking exceeded {self.budget_ms:.0f}ms, keeping heuristic order")
+        return results[:top_k]
+
+    def _failed(self, results: List[Any], top_k: int, error: Exception) -> List[Any]:
+        with self._lock:
+            self.failed += 1
+        print(f"⚠️ Reranking failed ({error!r}), keeping heuristic order")
+        return results[:top_k]
+
+    def rerank(self, query: str, results: List[Any], top_k: int) -> List[Any]:
+        """Top_k results in cross-encoder order, or in their given order if over budget"""
+        future = self._submit(query, results)
+        if future is None:
+            return results[:top_k]
+        try:
+            scores = future.result(timeout=self.budget_ms / 1000)
+        except FutureTimeout:
+            return self._timed_out(results, top_k)
+        except Exception as e:
+            return self._failed(results, top_k, e)
+        return self._ordered(results, scores, top_k)
+
+    async def arerank(self, query: str, results: List[Any], top_k: int) -> List[Any]:
+        """Async version of rerank()"""
+        future = self._submit(query, results)
+        if future is None:
+            return results[:top_k]
+        try:
+            scores = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.budget_ms / 1000)
+        except asyncio.TimeoutError:
+            return self._timed_out(results, top_k)
+        except Exception as e:
+            return self._failed(results, top_k, e)
+        return self._ordered(results, scores, top_k)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'model': self.model_name,
+            'budget_ms': self.budget_ms,
+            'candidates': self.candidates,
+            'workers': self.workers,
+            'reranked': self.reranked,
+            'timeouts': self.timeouts,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'avg_ms': round(self._avg_ms, 1)
+        }
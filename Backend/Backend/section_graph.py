@@ -0,0 +1,186 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+
+SECTION_GRAPH_PATH = "data/processed/section_graph.json"
+
+# Every Section node with its parent, for loading a snapshot straight from Neo4j
+SECTION_GRAPH_QUERY = """
+MATCH (s:Section)
+OPTIONAL MATCH (p:Section)-[:HAS_SUBSECTION]->(s)
+RETURN s.id as id,
+    s.title as title,
+    s.full_path as full_path,
+    s.level as level,
+    s.content as content,
+    p.id as parent_id
+"""
+
+class SectionGraphSnapshot:
+    """In-memory copy of the Section hierarchy stored in Neo4j.
+
+    Sections are addressed by row. Each row has a parent row (-1 for
+    top-level sections) and the children of all rows are kept in CSR form
+    (``child_offsets`` into ``child_rows``), derived from the parents at
+    load time. Content is truncated to 1000 characters and titles to 200,
+    like the Section nodes written by TXTNeo4jBuilder, so related_context()
+    returns what the Neo4j query would.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.sources: List[str] = []
+        self.titles: List[str] = []
+        self.paths: List[str] = []
+        self.levels: List[int] = []
+        self.contents: List[str] = []
+        self.parents = np.zeros(0, dtype=np.int32)
+        self._finalize()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- building ----------------------------------------------------------
+
+    def replace_source(self, source_file: str, sections: List[Any]):
+        """Replace every section of source_file with freshly parsed DocumentSections"""
+        keep = [row for row, source in enumerate(self.sources) if source != source_file]
+        parent_ids = [self.ids[self.parents[row]] if self.parents[row] >= 0 else None for row in keep]
+
+        self.ids = [self.ids[row] for row in keep]
+        self.sources = [self.sources[row] for row in keep]
+        self.titles = [self.titles[row] for row in keep]
+        self.paths = [self.paths[row] for row in keep]
+        self.levels = [self.levels[row] for row in keep]
+        self.contents = [self.contents[row] for row in keep]
+
+        for section in sections:
+            self.ids.append(section.id)
+            self.sources.append(source_file)
+            self.titles.append(section.title[:200])
+            self.paths.append(' > '.join(section.section_path))
+            self.levels.append(section.level)
+            self.contents.append(section.content[:1000])
+            parent_ids.append(section.parent_id)
+
+        self._set_parents(parent_ids)
+
+    @classmethod
+    def from_neo4j(cls, neo4j_client) -> "SectionGraphSnapshot":
+        """Snapshot of every Section node, read with one query"""
+        snapshot = cls()
+        parent_ids = []
+        for record in neo4j_client.query_graph(SECTION_GRAPH_QUERY):
+            snapshot.ids.append(record['id'])
+            snapshot.sources.append('')
+            snapshot.titles.append(record['title'] or '')
+            snapshot.paths.append(record['full_path'] or '')
+            snapshot.levels.append(record['level'] or 0)
+            snapshot.contents.append(record['content'] or '')
+            parent_ids.append(record['parent_id'])
+        snapshot._set_parents(parent_ids)
+        return snapshot
+
+    def _set_parents(self, parent_ids: List[Optional[str]]):
+        rows = {section_id: row for row, section_id in enumerate(self.ids)}
+        self.parents = np.array([rows.get(parent_id, -1) for parent_id in parent_ids], dtype=np.int32)
+        self._finalize()
+
+    def _finalize(self):
+        """Row lookup and the CSR child lists derived from the parent rows"""
+        self.rows = {section_id: row for row, section_id in enumerate(self.ids)}
+        has_parent = np.flatnonzero(self.parents >= 0)
+        order = has_parent[np.argsort(self.parents[has_parent], kind='stable')]
+        self.child_rows = order.astype(np.int32)
+        counts = np.bincount(self.parents[has_parent], minlength=len(self.ids))
+        self.child_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    # --- persistence ---------------------------------------------------------
+
+    @staticmethod
+    def exists(path: str = SECTION_GRAPH_PATH) -> bool:
+        return os.path.exists(path)
+
+    @classmethod
+    def load(cls, path: str = SECTION_GRAPH_PATH) -> "SectionGraphSnapshot":
+        snapshot = cls()
+        if not cls.exists(path):
+            return snapshot
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        snapshot.ids, snapshot.sources = table['ids'], table['sources']
+        snapshot.titles, snapshot.paths = table['titles'], table['paths']
+        snapshot.levels, snapshot.contents = table['levels'], table['contents']
+        snapshot.parents = np.array(table['parents'], dtype=np.int32)
+        snapshot._finalize()
+        return snapshot
+
+    def save(self, path: str = SECTION_GRAPH_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'ids': self.ids,
+                'sources': self.sources,
+                'titles': self.titles,
+                'paths': self.paths,
+                'levels': self.levels,
+                'contents': self.contents,
+                'parents': self.parents.tolist()
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        print(f"💾 Section graph saved: {len(self.ids)} sections")
+
+    # --- queries -----------------------------------------------------------------
+
+    def children(self, row: int) -> np.ndarray:
+        return self.child_rows[self.child_offsets[row]:self.child_offsets[row + 1]]
+
+    def descendants(self, section_id: str, max_depth: int = 2) -> List[str]:
+        """Ids of the subsections up to max_depth levels below section_id, breadth first"""
+        row = self.rows.get(section_id)
+        if row is None:
+            return []
+        return [self.ids[r] for r in self._descendant_rows([row], max_depth)]
+
+    def ancestors(self, section_id: str) -> List[str]:
+        """Ids from the section's parent up to its top-level section"""
+        chain = []
+        row = self.rows.get(section_id)
+        while row is not None and self.parents[row] >= 0 and len(chain) < len(self.ids):
+            row = int(self.parents[row])
+            chain.append(self.ids[row])
+        return chain
+
+    def _descendant_rows(self, rows: Iterable[int], max_depth: int) -> List[int]:
+        seen = set(rows)
+        found = []
+        frontier = list(rows)
+        for _ in range(max_depth):
+            next_frontier = []
+            for row in frontier:
+                for child in self.children(row):
+                    child = int(child)
+                    if child not in seen:
+                        seen.add(child)
+                        found.append(child)
+                        next_frontier.append(child)
+            frontier = next_frontier
+        return found
+
+    def related_context(self, section_ids: List[str], max_depth: int = 2) -> Dict[str, Any]:
+        """Same result as Neo4jClient.get_related_context, answered from memory"""
+        rows = list(dict.fromkeys(self.rows[s] for s in section_ids if s in self.rows))
+        rows += self._descendant_rows(rows, max_depth)
+        rows.sort(key=lambda row: self.levels[row])
+        return {'context': [
+            {
+                'section_id': self.ids[row],
+                'section_title': self.titles[row],
+                'section_path': self.paths[row],
+                'section_level': self.levels[row],
+                'content': self.contents[row]
+            }
+            for row in rows if self.contents[row]
+        ]}
@@ -0,0 +1,176 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SESSION = "default"
+
+class _Session:
+    __slots__ = ('turns', 'sizes', 'last_seen')
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.sizes = deque(maxlen=max_turns)
+        self.last_seen = time.time()
+
+    @property
+    def size(self) -> int:
+        return sum(self.sizes)
+
+class SessionHistoryStore:
+    """Conversation history keyed by session id.
+
+    Each session keeps its last ``max_turns`` turns. Sessions idle for
+    longer than ``idle_ttl`` seconds are dropped, and once the serialized
+    size of all in-memory turns passes ``max_memory_bytes`` the least
+    recently used sessions are evicted. With ``db_path`` set, turns are
+    also written to a local SQLite file so evicted sessions (and restarts)
+    can be reloaded on their next request.
+    """
+
+    def __init__(self, max_turns: Optional[int] = None,
+                 idle_ttl: Optional[float] = None,
+                 max_memory_bytes: Optional[int] = None,
+                 db_path: Optional[str] = None,
+                 sweep_interval: float = 60.0):
+        self.max_turns = max_turns or int(os.getenv("HISTORY_MAX_TURNS", "10"))
+        self.idle_ttl = idle_ttl or float(os.getenv("HISTORY_IDLE_TTL", "1800"))
+        self.max_memory_bytes = max_memory_bytes or int(float(os.getenv("HISTORY_MAX_MEMORY_MB", "64")) * 1024 * 1024)
+        db_path = db_path or os.getenv("HISTORY_DB_PATH")
+        self.sweep_interval = sweep_interval
+
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._memory_bytes = 0
+        self._last_sweep = time.time()
+        self.expired = 0
+        self.evicted = 0
+
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS turns (
+                session_id TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                payload TEXT NOT NULL
+            )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, created_at)")
+            self._db.commit()
+            print(f"💾 Conversation history persisted to {db_path}")
+
+    def append(self, session_id: str, turn: Dict[str, Any]):
+        payload = json.dumps(turn, ensure_ascii=False, default=str)
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            session = self._get(session_id, now)
+            if len(session.turns) == self.max_turns:
+                self._memory_bytes -= session.sizes[0]
+            session.turns.append(turn)
+            session.sizes.append(len(payload))
+            self._memory_bytes += len(payload)
+
+            if self._db is not None:
+                self._db.execute("INSERT INTO turns VALUES (?, ?, ?)", (session_id, now, payload))
+                self._db.execute("""DELETE FROM turns WHERE session_id = ? AND rowid NOT IN (
+                    SELECT rowid FROM turns WHERE session_id = ? ORDER BY created_at DESC, rowid DESC LIMIT ?
+                )""", (session_id, session_id, self.max_turns))
+                self._db.commit()
+
+            self._enforce_memory_cap(keep=session_id)
+
+    def recent(self, session_id: str, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The session's last n turns (all retained turns if n is None), oldest first"""
+        with self._lock:
+            self._sweep(time.time())
+            session = self._get(session_id, time.time(), create=False)
+            if session is None:
+                return []
+            # The session may just have been reloaded from SQLite
+            self._enforce_memory_cap(keep=session_id)
+            turns = list(session.turns)
+        return turns[-n:] if n else turns
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._drop(session_id)
+            if self._db is not None:
+                self._db.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+                self._db.commit()
+
+    def _get(self, session_id: str, now: float, create: bool = True) -> Optional[_Session]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._load(session_id)
+            if session is None and not create:
+                return None
+            session = session or _Session(self.max_turns)
+            self._sessions[session_id] = session
+            self._memory_bytes += session.size
+        session.last_seen = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _load(self, session_id: str) -> Optional[_Session]:
+        if self._db is None:
+            return None
+        rows = self._db.execute(
+            "SELECT created_at, payload FROM turns WHERE session_id = ? ORDER BY created_at DESC, rowid DESC LIMIT ?",
+            (session_id, self.max_turns)
+        ).fetchall()
+        if not rows or time.time() - rows[0][0] > self.idle_ttl:
+            return None
+        session = _Session(self.max_turns)
+        for _, payload in reversed(rows):
+            session.turns.append(json.loads(payload))
+            session.sizes.append(len(payload))
+        return session
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._memory_bytes -= session.size
+
+    def _sweep(self, now: float):
+        """Drop sessions idle for longer than the TTL (at most once per sweep_interval)"""
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        # _sessions is ordered by last access, so idle sessions are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen <= self.idle_ttl:
+                break
+            self._drop(session_id)
+            self.expired += 1
+        if self._db is not None:
+            self._db.execute("""DELETE FROM turns WHERE session_id IN (
+                SELECT session_id FROM turns GROUP BY session_id HAVING MAX(created_at) < ?
+            )""", (now - self.idle_ttl,))
+            self._db.commit()
+
+    def _enforce_memory_cap(self, keep: str):
+        """Evict least recently used sessions until under the memory cap"""
+        while self._memory_bytes > self.max_memory_bytes and len(self._sessions) > 1:
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                break
+            self._drop(session_id)
+            self.evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sessions': len(self._sessions),
+            'memory_bytes': self._memory_bytes,
+            'max_memory_bytes': self.max_memory_bytes,
+            'max_turns': self.max_turns,
+            'idle_ttl': self.idle_ttl,
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'persistent': self._db is not None
+        }
@@ -0,0 +1,71 @@
+import os
+import re
+from typing import Optional, Set
+
+class ShingleIndex:
+    """Near-duplicate detection by word shingles.
+
+    Each text is reduced to the set of hashed k-word shingles. A candidate
+    counts as a duplicate when at least ``threshold`` of its shingles
+    already occur in the texts added so far (containment rather than
+    Jaccard, so a graph section that merely starts with a chunk's text is
+    still kept for the rest of its content; trim() then cuts the part
+    that was already packed). Context assembly deals with a handful of
+    short texts, so exact shingle sets are used instead of MinHash
+    sketches.
+    """
+
+    def __init__(self, k: int = 5, threshold: Optional[float] = None):
+        self.k = k
+        self.threshold = threshold or float(os.getenv("DEDUP_CONTAINMENT", "0.8"))
+        self._seen: Set[int] = set()
+
+    def shingles(self, text: str) -> Set[int]:
+        words = re.findall(r'\w+', text.lower())
+        if len(words) < self.k:
+            return {hash(tuple(words))} if words else set()
+        return {hash(tuple(words[i:i + self.k])) for i in range(len(words) - self.k + 1)}
+
+    def coverage(self, text: str) -> float:
+        """Fraction of text's shingles already seen"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return 1.0
+        return len(shingles & self._seen) / len(shingles)
+
+    def is_duplicate(self, text: str) -> bool:
+        return self.coverage(text) >= self.threshold
+
+    def add(self, text: str):
+        self._seen |= self.shingles(text)
+
+    def trim(self, text: str, joiner: str = " ... ") -> str:
+        """text without the word runs whose shingles were already seen.
+
+        Uncovered runs shorter than k words (edges of an edit) are dropped
+        too; the remaining runs keep their original punctuation.
+        """
+        words = list(re.finditer(r'\w+', text))
+        if len(words) < self.k:
+            return "" if self.is_duplicate(text) else text
+        lowered = [w.group(0).lower() for w in words]
+        starts = [hash(tuple(lowered[i:i + self.k])) in self._seen
+                  for i in range(len(words) - self.k + 1)]
+        if not any(starts):
+            return text
+
+        covered = [False] * len(words)
+        for i, seen in enumerate(starts):
+            if seen:
+                for j in range(i, i + self.k):
+                    covered[j] = True
+
+        runs, start = [], None
+        for i, is_covered in enumerate(covered + [True]):
+            if not is_covered and start is None:
+                start = i
+            elif is_covered and start is not None:
+                if i - start >= self.k:
+                    runs.append(text[words[start].start():words[i - 1].end()])
+                start = None
+        return joiner.join(runs)
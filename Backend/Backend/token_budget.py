@@ -0,0 +1,39 @@
+import math
+import os
+import threading
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    """cl100k_base, loaded on first use; None if tiktoken is missing or can't fetch it"""
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding
+    with _encoding_lock:
+        if not _encoding_loaded and tiktoken is not None:
+            try:
+                # Llama 3's tokenizer is tiktoken-based; cl100k_base counts within a few percent of it
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # The BPE file is downloaded on first use, which fails offline
+                print(f"⚠️ tiktoken encoding unavailable ({e}), estimating tokens as characters / 4")
+        _encoding_loaded = True
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens for text (about 4 characters per token without tiktoken)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
@@ -1,7 +1,18 @@
+import hashlib
 import re
 from typing import List, Dict, Tuple
 from dataclasses import dataclass
 
+def stable_section_id(source_file: str, section_path: List[str], ordinal: int = 0) -> str:
+    """Id derived from the section's heading path, not its position in the file.
+
+    ordinal tells apart sections whose whole path repeats. Inserting or
+    editing one section leaves every other section's id (and so its
+    chunks' ids) unchanged, which keeps incremental re-indexing small.
+    """
+    key = f"{' > '.join(section_path)}#{ordinal}"
+    return f"{source_file}_s{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}"
+
 @dataclass
 class DocumentSection:
     id: str
@@ -33,7 +44,7 @@ class TXTStructureParser:
         sections = []
         current_hierarchy = []
         current_content = []
-        section_counter = 0
+        path_counts: Dict[str, int] = {}
         
         # Extract source filename
         import os
@@ -53,10 +64,6 @@ class TXTStructureParser:
                     self._save_section(current_hierarchy[-1], current_content, sections)
                     current_content = []
                 
-                # Create new section
-                section_id = f"{source_file}_s{section_counter}"  # FIXED: More unique IDs
-                section_counter += 1
-                
                 # Determine parent based on level hierarchy
                 parent_id = None
                 if current_hierarchy:
@@ -69,6 +76,12 @@ class TXTStructureParser:
                 # Build section path
                 section_path = [s.title for s in current_hierarchy] + [title]
                 
+                # Create new section
+                path_key = ' > '.join(section_path)
+                ordinal = path_counts.get(path_key, 0)
+                path_counts[path_key] = ordinal + 1
+                section_id = stable_section_id(source_file, section_path, ordinal)
+                
                 section = DocumentSection(
                     id=section_id,
                     title=title,
@@ -176,7 +189,6 @@ class TXTStructureParser:
         # NO overlapping""""""
     
         chunks = []
-        chunk_counter = 0
 
         for section in sections:
             # Skip empty or very small sections
@@ -202,13 +214,13 @@ class TXTStructureParser:
 
                 metadata = {k: v for k, v in metadata.items() if v is not None}
 
+                # Ids count chunks within the section, so other sections' ids don't shift
                 chunks.append({
-                    'id': f"{section.id}_chunk{chunk_counter}",
+                    'id': f"{section.id}_chunk0",
                     'text': content,
                     'metadata': metadata,
                     'section_path': section.section_path
                 })
-                chunk_counter += 1
 
             # Case 2: Large section → split internally (NO overlap)
             else:
@@ -230,12 +242,11 @@ class TXTStructureParser:
                     metadata = {k: v for k, v in metadata.items() if v is not None}
 
                     chunks.append({
-                        'id': f"{section.id}_chunk{chunk_counter}",
+                        'id': f"{section.id}_chunk{i // chunk_size}",
                         'text': sub_text,
                         'metadata': metadata,
                         'section_path': section.section_path
                     })
-                    chunk_counter += 1
 
         print(f"✅ Created {len(chunks)} hierarchical chunks from {len(sections)} sections")
 
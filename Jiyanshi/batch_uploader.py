@@ -0,0 +1,111 @@
+import os
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+@dataclass
+class UploadReport:
+    batches_ok: int = 0
+    batches_failed: int = 0
+    items_ok: int = 0
+    items_failed: int = 0
+    retries: int = 0
+    failed_ids: List[str] = field(default_factory=list)
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+class PipelinedUploader:
+    """Producer/consumer upload stage.
+
+    The producer (usually the embedder) calls submit() with ready batches;
+    N uploader threads drain a bounded queue, retrying each batch with
+    exponential backoff. submit() blocks when the queue is full, which
+    keeps the embedder from running arbitrarily far ahead of the network.
+
+        with PipelinedUploader(lambda batch: index.upsert(vectors=batch)) as uploader:
+            for batch in batches:
+                uploader.submit(batch)
+        report = uploader.report
+    """
+
+    def __init__(self, upload_fn: Callable[[List[Any]], Any],
+                 num_workers: Optional[int] = None,
+                 queue_size: Optional[int] = None,
+                 max_retries: Optional[int] = None,
+                 base_delay: float = 1.0,
+                 id_fn: Optional[Callable[[Any], str]] = None):
+        self.upload_fn = upload_fn
+        self.num_workers = num_workers or int(os.getenv("UPLOAD_WORKERS", "4"))
+        self.queue_size = queue_size or int(os.getenv("UPLOAD_QUEUE_SIZE", "8"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("UPLOAD_MAX_RETRIES", "4"))
+        self.base_delay = base_delay
+        self.id_fn = id_fn or (lambda item: item['id'])
+
+        self.report = UploadReport()
+        self._queue: "queue.Queue[Optional[Tuple[int, List[Any]]]]" = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._batch_counter = 0
+        self._threads: List[threading.Thread] = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker, name=f"uploader-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, batch: List[Any]):
+        """Queue a batch for upload, blocking while the queue is full"""
+        if not batch:
+            return
+        self._batch_counter += 1
+        self._queue.put((self._batch_counter, batch))
+
+    def close(self) -> UploadReport:
+        """Wait for every queued batch to finish and stop the workers"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        return self.report
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch_no, batch = job
+            self._upload_with_retry(batch_no, batch)
+
+    def _upload_with_retry(self, batch_no: int, batch: List[Any]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.upload_fn(batch)
+                with self._lock:
+                    self.report.batches_ok += 1
+                    self.report.items_ok += len(batch)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"❌ Upload batch {batch_no} failed after {attempt + 1} attempts: {e}")
+                    with self._lock:
+                        self.report.batches_failed += 1
+                        self.report.items_failed += len(batch)
+                        self.report.failed_ids.extend(self.id_fn(item) for item in batch)
+                        self.report.errors.append((batch_no, str(e)))
+                    return
+
+                delay = self.base_delay * (2 ** attempt) * (1 + random.random() * 0.25)
+                print(f"⚠️ Upload batch {batch_no} failed ({e}), retrying in {delay:.1f}s")
+                with self._lock:
+                    self.report.retries += 1
+                time.sleep(delay)
@@ -12,6 +12,9 @@ from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct
 from dotenv import load_dotenv
 
+# Same file as Backend/Backend/batch_uploader.py; keep the two identical
+from batch_uploader import PipelinedUploader
+
 # Load environment variables from .env (QDRANT_URL, QDRANT_API_KEY, etc.)
 load_dotenv()
 
@@ -150,10 +153,17 @@ class VectorStoreManager:
             ),
         )
 
-    def create_collection(self, documents: List[Document]):
+    def create_collection(
+        self,
+        documents: List[Document],
+        upload_workers: int = int(os.getenv("QDRANT_UPLOAD_WORKERS", "4")),
+        upload_queue_size: int = int(os.getenv("QDRANT_UPLOAD_QUEUE", "8")),
+    ):
         """
         Manually create / recreate collection and upsert all documents in small batches.
         Uses qdrant-client directly to avoid long blocking requests and timeouts.
+        Embedding runs on this thread while uploader threads push finished
+        batches, so network I/O overlaps with the next batch's embedding.
         """
         logger.info(
             f"Creating vector store collection on Qdrant Cloud (manual upsert): {self.collection_name}"
@@ -166,49 +176,61 @@ class VectorStoreManager:
             # 2) Upsert in small batches to avoid timeouts
             batch_size = 32  # small batch to keep each request light
             total_docs = len(documents)
-            logger.info(f"Upserting {total_docs} documents in batches of {batch_size}")
-
-            for start in range(0, total_docs, batch_size):
-                batch_docs = documents[start : start + batch_size]
-                texts = [d.page_content for d in batch_docs]
-
-                # Embed this batch
-                vectors = self.embeddings.embed_documents(texts)
-
-                # Prepare payloads (include text + metadata)
-                payloads = []
-                for doc in batch_docs:
-                    payload = dict(doc.metadata) if doc.metadata else {}
-                    payload["text"] = doc.page_content
-                    payloads.append(payload)
-
-                # Simple numeric IDs
-                ids = list(range(start, start + len(batch_docs)))
-
-                points = [
-                    PointStruct(
-                        id=ids[i],
-                        vector=vectors[i],
-                        payload=payloads[i],
-                    )
-                    for i in range(len(batch_docs))
-                ]
-
-                # Upsert with wait=False to avoid read timeouts
+            logger.info(
+                f"Upserting {total_docs} documents in batches of {batch_size} "
+                f"with {upload_workers} uploader threads"
+            )
+
+            # Upsert with wait=False to avoid read timeouts
+            def upload(points):
                 self.client.upsert(
                     collection_name=self.collection_name,
                     points=points,
                     wait=False,  # don't block until indexing fully done
                 )
 
-                logger.info(
-                    f"Upserted batch {start}–{start + len(batch_docs) - 1} "
-                    f"({len(batch_docs)} points)"
-                )
-
+            with PipelinedUploader(
+                upload,
+                num_workers=upload_workers,
+                queue_size=upload_queue_size,
+                id_fn=lambda point: point.id,
+            ) as uploader:
+                for start in range(0, total_docs, batch_size):
+                    batch_docs = documents[start : start + batch_size]
+                    texts = [d.page_content for d in batch_docs]
+
+                    # Embed this batch
+                    vectors = self.embeddings.embed_documents(texts)
+
+                    # Prepare payloads (include text + metadata)
+                    payloads = []
+                    for doc in batch_docs:
+                        payload = dict(doc.metadata) if doc.metadata else {}
+                        payload["text"] = doc.page_content
+                        payloads.append(payload)
+
+                    # Simple numeric IDs
+                    ids = list(range(start, start + len(batch_docs)))
+
+                    points = [
+                        PointStruct(
+                            id=ids[i],
+                            vector=vectors[i],
+                            payload=payloads[i],
+                        )
+                        for i in range(len(batch_docs))
+                    ]
+
+                    uploader.submit(points)
+
+            report = uploader.report
             logger.info(
-                f"Successfully upserted {total_docs} points into collection {self.collection_name}"
+                f"Upserted {report.items_ok}/{total_docs} points into collection "
+                f"{self.collection_name} ({report.batches_failed} failed batches, "
+                f"{report.retries} retries)"
             )
+            if report.failed_ids:
+                logger.error(f"Failed point ids: {report.failed_ids}")
 
             # 3) Return a LangChain QdrantVectorStore bound to this client for queries
             vector_store = QdrantVectorStore(
@@ -1,11 +1,15 @@
 import os
 import re
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 
+# Same files as Backend/Backend/keyword_matcher.py and graph_schema.py; keep them identical
+from keyword_matcher import KeywordMatcher
+from graph_schema import ensure_schema
+
 # =========================
 #  CONFIG + CONNECTION
 # =========================
@@ -20,7 +24,16 @@ SUBJECT_NAME = os.getenv("SUBJECT_NAME", "Unified Textbook Knowledge Graph")
 if not (NEO4J_URI and NEO4J_USER and NEO4J_PASSWORD):
     raise RuntimeError("Neo4j URI / USER / PASSWORD missing in .env")
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# Same pool settings as the backend's GraphConnectionManager
+driver = GraphDatabase.driver(
+    NEO4J_URI,
+    auth=(NEO4J_USER, NEO4J_PASSWORD),
+    max_connection_pool_size=int(os.getenv("NEO4J_POOL_SIZE", "50")),
+    connection_acquisition_timeout=float(os.getenv("NEO4J_ACQUIRE_TIMEOUT", "10")),
+    liveness_check_timeout=float(os.getenv("NEO4J_LIVENESS_CHECK", "30")),
+    max_connection_lifetime=float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "2700")),
+    keep_alive=True,
+)
 
 
 # =========================
@@ -80,13 +93,12 @@ BLOCK_KEYWORDS = {
 DEFAULT_BLOCK = "Other"
 
 
+BLOCK_MATCHER = KeywordMatcher(BLOCK_KEYWORDS)
+
+
 def guess_block(text_chunk: str) -> str:
-    """Heuristically assign a block name based on keywords in the unit text."""
-    lower = text_chunk.lower()
-    for block, keywords in BLOCK_KEYWORDS.items():
-        if any(k in lower for k in keywords):
-            return block
-    return DEFAULT_BLOCK
+    """Assign the block whose keywords occur most often (earlier blocks win ties)."""
+    return BLOCK_MATCHER.best(text_chunk, DEFAULT_BLOCK)
 
 
 UNIT_PATTERN = re.compile(
@@ -239,6 +251,23 @@ def extract_topics_concepts_questions(units: List[Unit]) -> None:
         unit.questions = list(dict.fromkeys(unit.questions))
 
 
+# =========================
+#  NEO4J SCHEMA
+# =========================
+
+# Uniqueness constraints (each backed by an index) on every property
+# the write helpers below MERGE or MATCH nodes by
+GRAPH_SCHEMA = [
+    ("subject_name_unique", "Subject", "name"),
+    ("block_name_unique", "Block", "name"),
+    ("unit_title_unique", "Unit", "title"),
+    ("topic_id_unique", "Topic", "id"),
+    ("subtopic_id_unique", "Subtopic", "id"),
+    ("concept_name_unique", "Concept", "name"),
+    ("question_text_unique", "Question", "text"),
+]
+
+
 # =========================
 #  NEO4J WRITE HELPERS
 # =========================
@@ -264,72 +293,107 @@ def merge_block(tx, subject_name: str, block_name: str):
     )
 
 
-def merge_unit(tx, block_name: str, unit: Unit):
+# =========================
+#  BULK (UNWIND) WRITES
+# =========================
+
+def batch_size_for(label: str) -> int:
+    """Rows per UNWIND transaction: NEO4J_BATCH_SIZE_<LABEL>, else NEO4J_BATCH_SIZE."""
+    default = os.getenv("NEO4J_BATCH_SIZE", "1000")
+    return int(os.getenv(f"NEO4J_BATCH_SIZE_{label.upper()}", default))
+
+
+def merge_units_batch(tx, rows: List[Dict]):
     tx.run(
         """
-        MATCH (b:Block {name: $block})
-        MERGE (u:Unit {title: $title})
-          ON CREATE SET u.number = $number
+        UNWIND $rows AS row
+        MATCH (b:Block {name: row.block})
+        MERGE (u:Unit {title: row.title})
+          ON CREATE SET u.number = row.number
         MERGE (b)-[:HAS_UNIT]->(u)
         """,
-        block=block_name,
-        title=unit.title,
-        number=unit.number,
+        rows=rows,
     )
 
 
-def merge_topic(tx, unit_title: str, topic: Topic):
-    if topic.level == 1:
-        tx.run(
-            """
-            MATCH (u:Unit {title: $unit_title})
-            MERGE (t:Topic {id: $id})
-              ON CREATE SET t.title = $title
-            MERGE (u)-[:HAS_TOPIC]->(t)
-            """,
-            unit_title=unit_title,
-            id=topic.id,
-            title=topic.title,
-        )
-    else:
-        # level 2: subtopic
-        tx.run(
-            """
-            MATCH (u:Unit {title: $unit_title})
-            MERGE (st:Subtopic {id: $id})
-              ON CREATE SET st.title = $title
-            MERGE (u)-[:HAS_SUBTOPIC]->(st)
-            """,
-            unit_title=unit_title,
-            id=topic.id,
-            title=topic.title,
-        )
+def merge_topics_batch(tx, rows: List[Dict]):
+    tx.run(
+        """
+        UNWIND $rows AS row
+        MATCH (u:Unit {title: row.unit_title})
+        MERGE (t:Topic {id: row.id})
+          ON CREATE SET t.title = row.title
+        MERGE (u)-[:HAS_TOPIC]->(t)
+        """,
+        rows=rows,
+    )
 
 
-def merge_concept(tx, unit_title: str, concept: str):
+def merge_subtopics_batch(tx, rows: List[Dict]):
     tx.run(
         """
-        MATCH (u:Unit {title: $unit_title})
-        MERGE (c:Concept {name: $name})
+        UNWIND $rows AS row
+        MATCH (u:Unit {title: row.unit_title})
+        MERGE (st:Subtopic {id: row.id})
+          ON CREATE SET st.title = row.title
+        MERGE (u)-[:HAS_SUBTOPIC]->(st)
+        """,
+        rows=rows,
+    )
+
+
+def merge_concepts_batch(tx, rows: List[Dict]):
+    tx.run(
+        """
+        UNWIND $rows AS row
+        MATCH (u:Unit {title: row.unit_title})
+        MERGE (c:Concept {name: row.name})
         MERGE (u)-[:HAS_CONCEPT]->(c)
         """,
-        unit_title=unit_title,
-        name=concept,
+        rows=rows,
     )
 
 
-def merge_question(tx, unit_title: str, question: str):
+def merge_questions_batch(tx, rows: List[Dict]):
     tx.run(
         """
-        MATCH (u:Unit {title: $unit_title})
-        MERGE (q:Question {text: $text})
+        UNWIND $rows AS row
+        MATCH (u:Unit {title: row.unit_title})
+        MERGE (q:Question {text: row.text})
         MERGE (u)-[:HAS_QUESTION]->(q)
         """,
-        unit_title=unit_title,
-        text=question,
+        rows=rows,
     )
 
 
+def write_in_batches(session, label: str, write_fn, rows: List[Dict]):
+    """Write rows with one execute_write per batch of batch_size_for(label)."""
+    size = batch_size_for(label)
+    for start in range(0, len(rows), size):
+        session.execute_write(write_fn, rows[start:start + size])
+    batches = (len(rows) + size - 1) // size
+    print(f"   → {label}: {len(rows)} rows in {batches} transaction(s)")
+
+
+def write_units(session, units: List[Unit]):
+    """Units and everything hanging off them, in a few UNWIND transactions per label."""
+    unit_rows, topic_rows, subtopic_rows, concept_rows, question_rows = [], [], [], [], []
+    for u in units:
+        unit_rows.append({"block": u.block_name, "title": u.title, "number": u.number})
+        for t in u.topics:
+            row = {"unit_title": u.title, "id": t.id, "title": t.title}
+            (topic_rows if t.level == 1 else subtopic_rows).append(row)
+        concept_rows += [{"unit_title": u.title, "name": c} for c in u.concepts]
+        question_rows += [{"unit_title": u.title, "text": q} for q in u.questions]
+
+    # Units first: the other labels MATCH them by title
+    write_in_batches(session, "Unit", merge_units_batch, unit_rows)
+    write_in_batches(session, "Topic", merge_topics_batch, topic_rows)
+    write_in_batches(session, "Subtopic", merge_subtopics_batch, subtopic_rows)
+    write_in_batches(session, "Concept", merge_concepts_batch, concept_rows)
+    write_in_batches(session, "Question", merge_questions_batch, question_rows)
+
+
 # =========================
 #  MAIN BUILD FUNCTION
 # =========================
@@ -350,8 +414,11 @@ def build_knowledge_graph(text_path: str):
         print(f"\n[UNIT] {u.title} | Block = {u.block_name}")
         print(f"   Topics: {len(u.topics)}, Concepts: {len(u.concepts)}, Questions: {len(u.questions)}")
 
+    print("\n🗂️ Ensuring constraints...")
+    ensure_schema(driver, GRAPH_SCHEMA)
+
     with driver.session() as session:
-        print("\n🧱 Creating Subject node...")
+        print("🧱 Creating Subject node...")
         session.execute_write(merge_subject, SUBJECT_NAME)
 
         # create all blocks that appear
@@ -361,14 +428,7 @@ def build_knowledge_graph(text_path: str):
             session.execute_write(merge_block, SUBJECT_NAME, b)
 
         print("🧱 Creating Units, Topics, Concepts, Questions...")
-        for u in units:
-            session.execute_write(merge_unit, u.block_name, u)
-            for t in u.topics:
-                session.execute_write(merge_topic, u.title, t)
-            for c in u.concepts:
-                session.execute_write(merge_concept, u.title, c)
-            for q in u.questions:
-                session.execute_write(merge_question, u.title, q)
+        write_units(session, units)
 
     print("\n✅ Knowledge Graph build complete!")
     print("Open Neo4j Browser and run, for example:")
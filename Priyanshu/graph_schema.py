@@ -0,0 +1,49 @@
+from typing import List, Optional, Set, Tuple
+
+# (name, label, property): a uniqueness constraint, which also gives
+# Neo4j an index on the property for MERGE and MATCH lookups.
+# The standalone graph scripts carry an identical copy of this file and
+# pass their own lists; keep the copies the same.
+
+# Section nodes written by TXTNeo4jBuilder, matched by id on every MERGE and read
+SECTION_SCHEMA = [
+    ('section_id_unique', 'Section', 'id'),
+]
+
+# Nodes written by Neo4jClient.create_knowledge_graph
+DOCUMENT_SCHEMA = [
+    ('document_id_unique', 'Document', 'id'),
+    ('section_id_unique', 'Section', 'id'),
+    ('root_id_unique', 'Root', 'id'),
+]
+
+def constraint_statement(name: str, label: str, prop: str) -> str:
+    return f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+
+def _constraint_names(session) -> Set[str]:
+    return {record['name'] for record in session.run("SHOW CONSTRAINTS YIELD name")}
+
+def ensure_schema(driver, schema: List[Tuple[str, str, str]],
+                  database: Optional[str] = None) -> List[str]:
+    """Create any missing uniqueness constraints; returns the names created.
+
+    Every statement uses IF NOT EXISTS, so running it before each build is
+    safe. A constraint that can't be created (e.g. duplicate values left
+    by an older build) is reported and skipped.
+    """
+    with driver.session(database=database) as session:
+        existing = _constraint_names(session)
+        for name, label, prop in schema:
+            if name in existing:
+                continue
+            try:
+                session.run(constraint_statement(name, label, prop)).consume()
+            except Exception as e:
+                print(f"⚠️ Could not create constraint {name} on {label}.{prop}: {e}")
+        created = sorted(_constraint_names(session) - existing)
+
+    if created:
+        print(f"🗂️ Created graph schema: {', '.join(created)}")
+    else:
+        print("🗂️ Graph schema already in place")
+    return created
@@ -4,11 +4,16 @@ import pdfplumber
 from neo4j import GraphDatabase
 from pathlib import Path
 import json
+# Same file as Backend/Backend/graph_schema.py; keep the two identical
+from graph_schema import ensure_schema
 
 # === CONFIGURATION ===
 NEO4J_URI = "bolt://127.0.0.1:7687"
 NEO4J_USERNAME = "neo4j"
 NEO4J_PASSWORD = "chatbot01"  # CHANGE THIS!
+NEO4J_POOL_SIZE = 50
+NEO4J_ACQUIRE_TIMEOUT = 10      # seconds to wait for a free connection
+NEO4J_LIVENESS_CHECK = 30       # ping connections idle longer than this
 PDF_FOLDER = "pdfs"
 # ====================
 
@@ -141,13 +146,26 @@ def analyze_pdf_structure(pdf_path, text):
     
     return data
 
+# Unique ids (each backed by an index) for the nodes matched by id below
+GRAPH_SCHEMA = [
+    ("document_id_unique", "Document", "id"),
+    ("heading_id_unique", "Heading", "id"),
+    ("activity_id_unique", "Activity", "id"),
+    ("keyword_id_unique", "Keyword", "id"),
+]
+
 def create_neo4j_graph_knowledge(all_data):
     """Create knowledge graph in Neo4j with proper syntax"""
     try:
         driver = GraphDatabase.driver(
             NEO4J_URI, 
-            auth=(NEO4J_USERNAME, NEO4J_PASSWORD)
+            auth=(NEO4J_USERNAME, NEO4J_PASSWORD),
+            max_connection_pool_size=NEO4J_POOL_SIZE,
+            connection_acquisition_timeout=NEO4J_ACQUIRE_TIMEOUT,
+            liveness_check_timeout=NEO4J_LIVENESS_CHECK,
+            keep_alive=True
         )
+        driver.verify_connectivity()
         
         print("  ✓ Connected to Neo4j")
         
@@ -156,6 +174,8 @@ def create_neo4j_graph_knowledge(all_data):
             session.run("MATCH (n) DETACH DELETE n")
             print("  ✓ Cleared previous data")
             
+            ensure_schema(driver, GRAPH_SCHEMA)
+            
             # Create all units
             for idx, data in enumerate(all_data):
                 unit_id = f"U{idx+1:03d}"
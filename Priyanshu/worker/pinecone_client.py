@@ -1,5 +1,6 @@
 import os
 from typing import List, Dict, Any
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 
@@ -37,35 +38,56 @@ class PineconeClient:
     
     def create_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Create embeddings for texts"""
-        embeddings = self.embedding_model.encode(texts)
-        return embeddings.tolist()
+        return self.embed(texts).tolist()
     
-    def upsert_chunks(self, chunks: List[Any]) -> None:
-        """Upsert document chunks to Pinecone"""
-        vectors = []
+    def embed(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Encode texts to a float32 matrix"""
+        embeddings = self.embedding_model.encode(texts, batch_size=batch_size)
+        return np.asarray(embeddings, dtype=np.float32)
+    
+    def upsert_chunks(self, chunks: List[Any], encode_batch_size: int = None) -> None:
+        """Embed and upsert document chunks to Pinecone.
+        
+        Chunks are encoded in batches of encode_batch_size (EMBED_BATCH_SIZE,
+        default 128) and every 100 vectors are uploaded as soon as they are
+        ready, so the whole corpus is never held in memory at once.
+        """
+        encode_batch_size = encode_batch_size or int(os.getenv("EMBED_BATCH_SIZE", "128"))
+        upsert_batch_size = 100
         
-        for chunk in chunks:
-            embedding = self.create_embeddings([chunk.text])[0]
+        pending = []
+        upserted = 0
+        for start in range(0, len(chunks), encode_batch_size):
+            batch_chunks = chunks[start:start + encode_batch_size]
+            embeddings = self.embed([chunk.text for chunk in batch_chunks], encode_batch_size)
             
-            vector = {
-                'id': chunk.chunk_id,
-                'values': embedding,
-                'metadata': {
-                    **chunk.metadata,
-                    'text': chunk.text[:500],  # Store first 500 chars for reference
-                    'neo4j_id': f"section_{hash(' > '.join(chunk.section_path)) % 1000000}",
-                    'type': 'document_chunk'
-                }
-            }
-            vectors.append(vector)
+            for chunk, embedding in zip(batch_chunks, embeddings):
+                pending.append(self._chunk_vector(chunk, embedding))
+                if len(pending) == upsert_batch_size:
+                    self.index.upsert(vectors=pending)
+                    upserted += len(pending)
+                    pending = []
+            
+            print(f"  Embedded {min(start + encode_batch_size, len(chunks))}/{len(chunks)} chunks")
         
-        # Upsert in batches
-        batch_size = 100
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i + batch_size]
-            self.index.upsert(vectors=batch)
+        if pending:
+            self.index.upsert(vectors=pending)
+            upserted += len(pending)
         
-        print(f"Upserted {len(vectors)} vectors to Pinecone")
+        print(f"Upserted {upserted} vectors to Pinecone")
+    
+    def _chunk_vector(self, chunk: Any, embedding: np.ndarray) -> Dict[str, Any]:
+        """Pinecone vector payload for one chunk (float32 -> list only here)"""
+        return {
+            'id': chunk.chunk_id,
+            'values': embedding.tolist(),
+            'metadata': {
+                **chunk.metadata,
+                'text': chunk.text[:500],  # Store first 500 chars for reference
+                'neo4j_id': f"section_{hash(' > '.join(chunk.section_path)) % 1000000}",
+                'type': 'document_chunk'
+            }
+        }
     
     def search(self, query: str, top_k: int = 5) -> List[Dict]:
         """Search for similar chunks"""
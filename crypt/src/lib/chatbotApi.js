@@ -19,6 +19,19 @@ const chatbotApi = axios.create({
     timeout: 60000, // 60 second timeout for AI responses
 });
 
+/**
+ * Per-browser conversation id so each student gets their own history
+ * @returns {string}
+ */
+const getSessionId = () => {
+    let sessionId = localStorage.getItem('chatbotSessionId');
+    if (!sessionId) {
+        sessionId = crypto.randomUUID();
+        localStorage.setItem('chatbotSessionId', sessionId);
+    }
+    return sessionId;
+};
+
 /**
  * Send a message and get just the answer text
  * @param {string} question - The question to ask
@@ -29,6 +42,7 @@ export const sendMessage = async (question, useHistory = true) => {
     const response = await chatbotApi.post('/chat/simple', {
         question,
         use_history: useHistory,
+        session_id: getSessionId(),
     });
     return response.data;
 };
@@ -43,6 +57,7 @@ export const sendMessageWithSources = async (question, useHistory = true) => {
     const response = await chatbotApi.post('/chat', {
         question,
         use_history: useHistory,
+        session_id: getSessionId(),
     });
     return response.data;
 };
@@ -52,7 +67,9 @@ export const sendMessageWithSources = async (question, useHistory = true) => {
  * @returns {Promise<{status: string, message: string}>}
  */
 export const clearHistory = async () => {
-    const response = await chatbotApi.post('/clear-history');
+    const response = await chatbotApi.post('/clear-history', null, {
+        params: { session_id: getSessionId() },
+    });
     return response.data;
 };
 
@@ -61,7 +78,9 @@ export const clearHistory = async () => {
  * @returns {Promise<{history: Array, count: number}>}
  */
 export const getHistory = async () => {
-    const response = await chatbotApi.get('/history');
+    const response = await chatbotApi.get('/history', {
+        params: { session_id: getSessionId() },
+    });
     return response.data;
 };
 